@@ -5,6 +5,7 @@ import os
 import glob
 import re
 from pathlib import Path
+from instrumentation import PipelineMetrics
 
 def load_csv_data(csv_files):
     """Load all plot data from CSV files with multiple normalization strategies"""
@@ -57,10 +58,12 @@ def get_movies_without_plots(db_path):
     conn.close()
     return movies
 
-def find_missing_plots(db_path, plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data):
+def find_missing_plots(db_path, plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data, metrics=None):
     """Find additional plots using multiple heuristics"""
     movies_without_plots = get_movies_without_plots(db_path)
     print(f"Movies without plots: {len(movies_without_plots)}")
+    if metrics:
+        metrics.increment("movies_scanned", len(movies_without_plots))
     
     additional_matches = []
     
@@ -108,6 +111,8 @@ def find_missing_plots(db_path, plot_data, normalized_plot_data, no_article_plot
         
         if plot:
             additional_matches.append((movie_id, db_title, plot, match_type))
+            if metrics:
+                metrics.record_match(match_type)
     
     return additional_matches
 
@@ -182,18 +187,27 @@ def main():
     print(f"Target database: {db_path}")
     print(f"Found {len(csv_files)} CSV files")
     
+    metrics = PipelineMetrics("advanced_plot_extraction")
+    
     # Load plot data with multiple strategies
-    plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data = load_csv_data(csv_files)
+    with metrics.stage("load_csv") as stage:
+        plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data = load_csv_data(csv_files)
+        stage["rows"] = len(plot_data)
     
     # Analyze missing patterns
-    analyze_missing_patterns(db_path)
+    with metrics.stage("analyze"):
+        analyze_missing_patterns(db_path)
     
     # Find additional plots
-    additional_matches = find_missing_plots(db_path, plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data)
+    with metrics.stage("find_matches") as stage:
+        additional_matches = find_missing_plots(db_path, plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data, metrics)
+        stage["rows"] = metrics.counters["movies_scanned"]
     
     if additional_matches:
         print(f"\nFound {len(additional_matches)} additional matches!")
-        update_database_with_additional_plots(db_path, additional_matches)
+        with metrics.stage("db_write", rows=len(additional_matches)):
+            update_database_with_additional_plots(db_path, additional_matches)
+        metrics.increment("movies_updated", len(additional_matches))
     else:
         print("\nNo additional matches found with current heuristics.")
     
@@ -210,6 +224,8 @@ def main():
     print(f"Movies with plots: {final_count}")
     print(f"Total movies: {total_count}")
     print(f"Match rate: {final_count/total_count*100:.1f}%")
+    
+    metrics.write()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
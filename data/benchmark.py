@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+import convert_data
+import ultimate_plot_extraction
+from instrumentation import current_rss_kb, peak_rss_kb, rss_delta_kb
+from match_cache import BACKFILL_SCOPE, MatchCache
+from title_matching import (
+    FUZZY_ACCEPT, FUZZY_THRESHOLD, STRATEGIES, STRATEGY_FUNCTIONS, normalize_title, find_fuzzy_matches,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Stages slower than baseline by more than this fraction count as regressions
+DEFAULT_TOLERANCE = 0.25
+
+# Slowdowns smaller than this many seconds are timer noise, whatever the fraction
+DEFAULT_MIN_DELTA = 0.005
+
+# Times each size is benchmarked; stages report the median
+DEFAULT_REPEAT = 3
+
+WORDS = [
+    "night", "shadow", "return", "last", "house", "dark", "love", "city", "king",
+    "river", "storm", "dead", "secret", "island", "war", "summer", "blood", "star",
+    "ghost", "road", "queen", "fire", "silent", "lost", "black", "wild", "dream",
+    "empire", "hunter", "legend", "winter", "midnight", "broken", "golden", "game",
+]
+SUBTITLES = ["Rising", "The Beginning", "Part Two", "Reckoning", "Legacy", "Origins"]
+ARTICLES = ["The", "A", "An"]
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Horror", "Thriller", "Romance",
+          "Science Fiction", "Animation", "Fantasy", "Crime", "Documentary"]
+LANGUAGES = ["en", "en", "en", "fr", "es", "ja", "ko", "de"]
+SENTENCE_WORDS = WORDS + ["a", "the", "and", "of", "to", "in", "finds", "must",
+                          "young", "family", "against", "before", "after", "town"]
+
+def random_sentence(rng, min_words=8, max_words=20):
+    """Build a random sentence from the sentence vocabulary"""
+    words = [rng.choice(SENTENCE_WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+def random_title(rng):
+    """Build a base catalog title with optional article, number and subtitle"""
+    words = [rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4))]
+    title = " ".join(words)
+    if rng.random() < 0.25:
+        title = f"{rng.choice(ARTICLES)} {title}"
+    if rng.random() < 0.1:
+        title = f"{title} {rng.randint(2, 5)}"
+    if rng.random() < 0.15:
+        title = f"{title}: {rng.choice(SUBTITLES)}"
+    return title
+
+def noisy_title(rng, title, year):
+    """Apply the title noise seen between the catalog and the plot CSVs"""
+    roll = rng.random()
+    if roll < 0.35:
+        return title
+    if roll < 0.5:
+        return f"{title} ({year} film)"
+    if roll < 0.6:
+        return f"{title} (film)"
+    if roll < 0.68:
+        return f"{rng.choice(ARTICLES)} {title}"
+    if roll < 0.76:
+        return title.split(":")[0] if ":" in title else f"{title}: {rng.choice(SUBTITLES)}"
+    if roll < 0.84:
+        return title.replace(" ", " - ", 1) + "!"
+    if roll < 0.92:
+        return title.upper() if rng.random() < 0.5 else title.lower()
+    # Typo for the fuzzy pass
+    if len(title) > 4:
+        i = rng.randrange(len(title) - 1)
+        return title[:i] + title[i + 1] + title[i] + title[i + 2:]
+    return title
+
+def generate_catalog(size, out_dir, seed=42, plot_ratio=0.8):
+    """Write a synthetic parquet catalog and plot CSV with `size` movies.
+
+    Returns (parquet_path, csv_path).
+    """
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = []
+    plot_rows = []
+    for i in range(size):
+        title = random_title(rng)
+        year = rng.randint(2000, 2024)
+        rows.append({
+            "Release_Date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Title": title,
+            "Overview": " ".join(random_sentence(rng) for _ in range(rng.randint(1, 3))),
+            "Popularity": round(rng.uniform(1, 5000), 3),
+            "Vote_Count": str(rng.randint(0, 20000)),
+            "Vote_Average": str(round(rng.uniform(1, 10), 1)),
+            "Original_Language": rng.choice(LANGUAGES),
+            "Genre": ", ".join(rng.sample(GENRES, rng.randint(1, 3))),
+            "Poster_Url": f"https://image.tmdb.org/t/p/original/{i:08d}.jpg",
+        })
+        if rng.random() < plot_ratio:
+            plot_rows.append({
+                "title": noisy_title(rng, title, year),
+                "image": "",
+                "plot": " ".join(random_sentence(rng) for _ in range(rng.randint(3, 30))),
+            })
+
+    parquet_path = out_dir / f"catalog-{size}.parquet"
+    csv_path = out_dir / f"plots-{size}.csv"
+    pd.DataFrame(rows).to_parquet(parquet_path, index=False)
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["title", "image", "plot"])
+        writer.writeheader()
+        writer.writerows(plot_rows)
+
+    return parquet_path, csv_path
+
+def measure(func, rows=None, trace_memory=False):
+    """Run func and return (result, stats) with wall time and memory usage.
+
+    tracemalloc slows allocation-heavy stages considerably, so allocation
+    peaks are only collected when trace_memory is set.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+
+    stats = {
+        "seconds": round(seconds, 6),
+        "rss_delta_kb": rss_delta_kb(rss_before),
+        "process_peak_rss_kb": peak_rss_kb(),
+    }
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats["peak_alloc_kb"] = peak // 1024
+    if rows is not None:
+        stats["rows"] = rows
+        stats["rows_per_sec"] = round(rows / seconds, 1) if seconds > 0 else None
+    return result, stats
+
+def stage_memory(stats):
+    """Describe a stage's own memory use: its allocation peak if traced, else its RSS change"""
+    if "peak_alloc_kb" in stats:
+        return f"peak alloc {stats['peak_alloc_kb']} KiB"
+    if stats["rss_delta_kb"] is None:
+        return "RSS change n/a"
+    return f"RSS {stats['rss_delta_kb']:+d} KiB"
+
+def run_strategy(db_titles, indexes, name):
+    """Look up every DB title with one strategy and return (movie_id, title, key) hits"""
+    if name == "case_insensitive_normalized":
+        key_func = lambda title: normalize_title(title).lower()
+    else:
+        key_func = STRATEGY_FUNCTIONS[name]
+    index = indexes[name]
+    return [(movie_id, title, key) for movie_id, title in db_titles
+            if (key := key_func(title)) in index]
+
+def median_stats(runs):
+    """Merge repeated runs of the same stages into the median time per stage.
+
+    Other stats are taken from the first run; every run's time is kept
+    under "samples".
+    """
+    merged = {}
+    for stage, stats in runs[0].items():
+        samples = [run[stage]["seconds"] for run in runs]
+        seconds = statistics.median(samples)
+        merged[stage] = dict(stats, seconds=round(seconds, 6), samples=samples)
+        if stats.get("rows") is not None:
+            merged[stage]["rows_per_sec"] = round(stats["rows"] / seconds, 1) if seconds > 0 else None
+    return merged
+
+def bench_size(size, work_dir, seed, fuzzy_sample, trace_memory=False, repeat=DEFAULT_REPEAT):
+    """Benchmark every pipeline stage on a synthetic catalog of `size` movies.
+
+    The stages run `repeat` times on the same catalog and each reports its
+    median time, so one slow sample doesn't read as a regression.
+    """
+    print(f"\n=== {size} movies ===")
+    parquet_path, csv_path = generate_catalog(size, work_dir, seed)
+    runs = [bench_stages(size, parquet_path, csv_path, work_dir, seed, fuzzy_sample, trace_memory)
+            for _ in range(repeat)]
+    results = median_stats(runs)
+
+    for stage, stats in results.items():
+        print(f"  {stage}: {stats['seconds']:.3f}s (median of {repeat}), {stage_memory(stats)} "
+              f"(process peak {stats['process_peak_rss_kb']} KiB)")
+    return results
+
+def bench_stages(size, parquet_path, csv_path, work_dir, seed, fuzzy_sample, trace_memory=False):
+    """Run every pipeline stage once on a generated catalog and return their stats"""
+    results = {}
+    db_path = Path(work_dir) / f"movies-{size}.db"
+    if db_path.exists():
+        db_path.unlink()
+
+    _, results["convert_load"] = measure(
+        lambda: convert_data.load_catalog(parquet_path), rows=size, trace_memory=trace_memory
+    )
+    _, results["convert"] = measure(
+        lambda: convert_data.convert(parquet_path, db_path), rows=size, trace_memory=trace_memory
+    )
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE movies ADD COLUMN plot TEXT")
+    conn.commit()
+    db_titles = conn.execute("SELECT id, title FROM movies").fetchall()
+    conn.close()
+
+    (plot_data, indexes), results["load_csv"] = measure(
+        lambda: ultimate_plot_extraction.load_csv_data([str(csv_path)]),
+        trace_memory=trace_memory,
+    )
+    results["load_csv"]["rows"] = len(plot_data)
+
+    # Each strategy is timed over the full title list so they are comparable
+    matched = {}
+    for name in STRATEGIES + ["case_insensitive_normalized"]:
+        hits, results[f"strategy_{name}"] = measure(
+            lambda: run_strategy(db_titles, indexes, name),
+            rows=len(db_titles),
+            trace_memory=trace_memory,
+        )
+        results[f"strategy_{name}"]["matches"] = len(hits)
+        for movie_id, title, key in hits:
+            matched.setdefault(movie_id, (name, key))
+
+    # Fuzzy matching is quadratic, so only a sample of unmatched titles is timed
+    unmatched = [(movie_id, title) for movie_id, title in db_titles if movie_id not in matched]
+    sample = random.Random(seed).sample(unmatched, min(fuzzy_sample, len(unmatched)))
+    fuzzy_hits, results["fuzzy"] = measure(
+        lambda: [find_fuzzy_matches(normalize_title(title), indexes["normalized"], threshold=FUZZY_THRESHOLD)
+                 for _, title in sample],
+        rows=len(sample),
+        trace_memory=trace_memory,
+    )
+    results["fuzzy"]["matches"] = sum(1 for hits in fuzzy_hits if hits and hits[0][2] >= FUZZY_ACCEPT)
+
+    # The production write path, with the decisions above preloaded into the
+    # match cache so the quadratic fuzzy pass isn't timed a second time
+    cache_path = Path(work_dir) / f"match-cache-{size}.db"
+    if cache_path.exists():
+        cache_path.unlink()
+    cache = MatchCache(plot_data, BACKFILL_SCOPE, path=cache_path, max_rows=len(db_titles))
+    for movie_id, title in db_titles:
+        if movie_id in matched:
+            name, key = matched[movie_id]
+            cache.store(title, name, key, 1.0)
+        else:
+            cache.store(title)
+    cache.flush()
+    backfilled, results["db_write"] = measure(
+        lambda: ultimate_plot_extraction.backfill_in_batches(str(db_path), indexes, cache=cache),
+        rows=len(db_titles),
+        trace_memory=trace_memory,
+    )
+    results["db_write"]["matches"] = len(backfilled)
+    cache.conn.close()
+    return results
+
+def bench_cli_startup(runs=10):
+    """Time cold starts of the pinestream-data CLI for a lightweight command"""
+    cli = Path(__file__).parent / "pinestream_data.py"
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(cli), "--help"], check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+
+    # Interpreter startup alone, so the CLI's own import cost can be told apart
+    baseline = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline.append(time.perf_counter() - start)
+
+    seconds = statistics.median(timings)
+    stats = {
+        "seconds": round(seconds, 6),
+        "interpreter_seconds": round(statistics.median(baseline), 6),
+        "runs": runs,
+    }
+    print(f"\n=== CLI STARTUP ===")
+    print(f"  pinestream-data --help: {seconds * 1000:.1f}ms (interpreter {stats['interpreter_seconds'] * 1000:.1f}ms)")
+    return stats
+
+def compare(results, baseline, tolerance, min_delta=DEFAULT_MIN_DELTA):
+    """Print stage-by-stage changes against a baseline and return regressions.
+
+    A stage regresses when it is slower by more than min_delta seconds and
+    by more than the tolerance fraction, so millisecond stages don't trip
+    the percentage on timer noise.
+    """
+    regressions = []
+    print(f"\n=== COMPARISON (tolerance {tolerance:.0%}, at least {min_delta * 1000:.0f}ms) ===")
+    groups = list(results["sizes"].items())
+    base_groups = dict(baseline.get("sizes", {}))
+    if "startup" in results:
+        groups.append(("startup", results["startup"]))
+        base_groups["startup"] = baseline.get("startup")
+    for size, stages in groups:
+        base_stages = base_groups.get(size)
+        if not base_stages:
+            print(f"{size}: no baseline")
+            continue
+        for stage, stats in stages.items():
+            base = base_stages.get(stage)
+            if not base or not base["seconds"]:
+                continue
+            change = stats["seconds"] / base["seconds"] - 1
+            regressed = stats["seconds"] - base["seconds"] > min_delta and change > tolerance
+            flag = "REGRESSION" if regressed else "ok"
+            print(f"  {size} {stage}: {base['seconds']:.3f}s -> {stats['seconds']:.3f}s ({change:+.1%}) {flag}")
+            if regressed:
+                regressions.append((size, stage, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES[:1],
+                        help=f"catalog sizes to benchmark, e.g. {' '.join(map(str, DEFAULT_SIZES))}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fuzzy-sample", type=int, default=50,
+                        help="number of unmatched titles to fuzzy match")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record tracemalloc allocation peaks (slows every stage)")
+    parser.add_argument("--work-dir", help="where synthetic catalogs are written (default: temp dir)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="compare against a previous results file")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="runs per size; each stage reports its median time")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help="seconds a stage must slow down by before the tolerance applies")
+    parser.add_argument("--skip-startup", action="store_true", help="don't time CLI cold starts")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pinestream-bench-")
+    print(f"Work directory: {work_dir}")
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "fuzzy_sample": args.fuzzy_sample,
+            "trace_memory": args.trace_memory,
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "sizes": {},
+    }
+    for size in args.sizes:
+        results["sizes"][str(size)] = bench_size(
+            size, work_dir, args.seed, args.fuzzy_sample, args.trace_memory, args.repeat
+        )
+
+    if not args.skip_startup:
+        results["startup"] = {"cli_help": bench_cli_startup()}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
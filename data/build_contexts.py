@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from checkpoints import batched, fail_stage, finish_stage, save_checkpoint, start_stage
+from instrumentation import PipelineMetrics
+
+# Token budget for one movie's context, shared by the rerank and RAG prompts
+TOKEN_BUDGET = int(os.environ.get("PINESTREAM_CONTEXT_TOKENS", "200"))
+
+# Share of the budget the overview may take before plot sentences are added
+OVERVIEW_SHARE = 0.4
+
+# Plot sentences with fewer content words ("In the U.S.") are never picked
+MIN_CONTENT_WORDS = 4
+
+# Checkpoint row in pipeline_checkpoints, also shown by /api/admin/progress
+CHECKPOINT_STAGE = "rag_contexts"
+
+# Words ending in a period that don't end the sentence
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "st", "jr", "sr", "mt", "vs", "lt", "sgt", "capt", "prof", "gen", "col"}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with",
+    "by", "from", "as", "is", "are", "was", "were", "be", "been", "his", "her", "their",
+    "he", "she", "they", "it", "its", "him", "them", "who", "which", "that", "this",
+    "after", "before", "when", "while", "into", "out", "up", "has", "have", "had",
+    "not", "so", "then", "than", "also", "there", "where", "one", "two",
+}
+
+def estimate_tokens(text):
+    """Estimate LLM tokens for text (about four characters per token)"""
+    return math.ceil(len(text) / 4)
+
+def ends_with_abbreviation(text):
+    match = re.search(r"([A-Za-z]+)\.$", text)
+    return bool(match) and match.group(1).lower() in ABBREVIATIONS
+
+def split_sentences(text):
+    """Split text into sentences on terminal punctuation.
+
+    A piece starting in lowercase ("F.E.A.S.T. building") or following an
+    abbreviation such as "St." continues the previous sentence.
+    """
+    sentences = []
+    for piece in re.split(r'(?<=[.!?])\s+', text.strip()):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and (piece[0].islower() or ends_with_abbreviation(sentences[-1])):
+            sentences[-1] += " " + piece
+        else:
+            sentences.append(piece)
+    return sentences
+
+def content_words(text):
+    """Lowercase words without stopwords"""
+    return [word for word in re.findall(r"[a-z']+", text.lower()) if word not in STOPWORDS]
+
+def score_sentences(sentences, title, overview):
+    """Score plot sentences by term frequency, overlap with title/overview and position"""
+    frequencies = Counter(word for sentence in sentences for word in content_words(sentence))
+    # Scaled to 0-1 like the other terms, so repeated names don't outweigh them on long plots
+    top_frequency = max(frequencies.values(), default=1)
+    anchors = set(content_words(title or "")) | set(content_words(overview or ""))
+
+    scores = []
+    for position, sentence in enumerate(sentences):
+        words = content_words(sentence)
+        if len(words) < MIN_CONTENT_WORDS:
+            scores.append(0.0)
+            continue
+        salience = sum(frequencies[word] for word in words) / len(words) / top_frequency
+        overlap = sum(1 for word in words if word in anchors) / len(words)
+        # Early sentences usually set up the premise
+        lead = 1.0 / (1 + position)
+        scores.append(salience + 2 * overlap + lead)
+    return scores
+
+def fit_sentences(sentences, budget):
+    """Take whole sentences from the start of a list until the budget is used"""
+    taken = []
+    used = 0
+    for sentence in sentences:
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > budget:
+            break
+        taken.append(sentence)
+        used += cost
+    return taken
+
+def truncate_words(text, budget):
+    """Cut text at a word boundary so it fits the budget"""
+    limit = budget * 4 - 3
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+def build_context(title, overview, plot, genre, release_date, budget=TOKEN_BUDGET):
+    """Build a compact context snippet for one movie within a token budget.
+
+    Returns (context, token_count, plot_sentence_count).
+    """
+    header_parts = []
+    if release_date:
+        header_parts.append(release_date[:4])
+    if genre:
+        header_parts.append(genre)
+    header = " | ".join(header_parts)
+
+    remaining = budget - estimate_tokens(header)
+    lines = [header] if header else []
+
+    if overview:
+        overview_budget = int(budget * OVERVIEW_SHARE)
+        overview_sentences = fit_sentences(split_sentences(overview), overview_budget)
+        if overview_sentences:
+            overview_text = " ".join(overview_sentences)
+        else:
+            # A single long sentence is cut rather than dropped
+            overview_text = truncate_words(overview, overview_budget)
+        lines.append(f"Overview: {overview_text}")
+        remaining -= estimate_tokens(lines[-1]) + 1
+
+    plot_sentences = split_sentences(plot) if plot else []
+    selected = []
+    if plot_sentences and remaining > 0:
+        scores = score_sentences(plot_sentences, title, overview)
+        ranked = sorted(range(len(plot_sentences)), key=lambda i: scores[i], reverse=True)
+        used = estimate_tokens("Plot: ")
+        chosen = set()
+        for i in ranked:
+            cost = estimate_tokens(plot_sentences[i]) + 1
+            if scores[i] <= 0 or used + cost > remaining:
+                continue
+            chosen.add(i)
+            used += cost
+        # Keep the chosen sentences in story order
+        selected = [plot_sentences[i] for i in sorted(chosen)]
+        if selected:
+            lines.append(f"Plot: {' '.join(selected)}")
+
+    context = "\n".join(lines)
+    return context, estimate_tokens(context), len(selected)
+
+def create_contexts_table(conn):
+    """Create movie_contexts table if it doesn't exist"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS movie_contexts (
+        movie_id INTEGER PRIMARY KEY,
+        context TEXT NOT NULL,
+        token_count INTEGER NOT NULL,
+        token_budget INTEGER NOT NULL,
+        plot_sentences INTEGER NOT NULL,
+        FOREIGN KEY (movie_id) REFERENCES movies(id)
+    )
+    ''')
+    conn.commit()
+
+def build_contexts(db_path, metrics=None, budget=TOKEN_BUDGET, stage=CHECKPOINT_STAGE):
+    """Precompute context snippets for every movie in committed batches"""
+    conn = sqlite3.connect(db_path)
+    create_contexts_table(conn)
+    movies = conn.execute('''
+    SELECT id, title, overview, plot, genre, release_date
+    FROM movies
+    ORDER BY id
+    ''').fetchall()
+
+    checkpoint = start_stage(conn, stage, len(movies))
+    if checkpoint["last_processed_id"] == 0:
+        conn.execute("DELETE FROM movie_contexts")
+    remaining = [movie for movie in movies if movie[0] > checkpoint["last_processed_id"]]
+
+    total_tokens = 0
+    built = 0
+    try:
+        for batch in batched(remaining):
+            rows = []
+            for movie_id, title, overview, plot, genre, release_date in batch:
+                context, tokens, sentences = build_context(title, overview, plot, genre, release_date, budget)
+                if not context:
+                    continue
+                rows.append((movie_id, context, tokens, budget, sentences))
+                total_tokens += tokens
+            conn.executemany('''
+            INSERT OR REPLACE INTO movie_contexts (movie_id, context, token_count, token_budget, plot_sentences)
+            VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            # The checkpoint commits together with the batch's contexts
+            save_checkpoint(conn, stage, batch[-1][0], len(batch), len(rows))
+            built += len(rows)
+    except BaseException as e:
+        fail_stage(conn, stage, e)
+        conn.close()
+        raise
+
+    finish_stage(conn, stage, f"Completed! Built {checkpoint['matched'] + built} movie contexts.")
+    conn.close()
+
+    if metrics:
+        metrics.increment("contexts_built", built)
+        metrics.increment("context_tokens", total_tokens)
+
+    print(f"Built {built} movie contexts with a {budget}-token budget")
+    if built:
+        print(f"Average context size: {total_tokens / built:.1f} tokens")
+    return built
+
+def main():
+    # Paths - target webapp database
+    script_dir = Path(__file__).parent
+    webapp_dir = script_dir.parent / "webapp"
+    db_path = webapp_dir / "movies.db"
+
+    print(f"Target database: {db_path}")
+
+    # Check if webapp database exists
+    if not db_path.exists():
+        print(f"Error: Database file {db_path} not found!")
+        return
+
+    metrics = PipelineMetrics("build_contexts")
+    with metrics.stage("build_contexts") as stage:
+        build_contexts(db_path, metrics)
+        stage["rows"] = metrics.counters.get("contexts_built", 0)
+    metrics.write()
+
+if __name__ == "__main__":
+    main()
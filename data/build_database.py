@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Build a read-optimized copy of the webapp database and swap it in.
+
+Pipeline stages write to a staging file next to the live database instead of
+the file the webapp is serving. Publishing creates indexes, runs ANALYZE,
+rebuilds keyed tables WITHOUT ROWID and writes a compact copy with
+VACUUM INTO, then renames it over the live file. Tables the webapp writes at
+runtime are copied from the live file just before the rename.
+"""
+import os
+import sqlite3
+from pathlib import Path
+from checkpoints import has_progress, unfinished_stages
+from instrumentation import PipelineMetrics
+
+# Page size of the published file; larger pages suit scans of long plot text
+PAGE_SIZE = int(os.environ.get("PINESTREAM_PAGE_SIZE", "8192"))
+
+# Tables the webapp writes while serving, taken from the live file at swap time
+LIVE_TABLES = ("user_watched_movies", "chunk_mappings")
+
+# Tables rebuilt WITHOUT ROWID, keyed by their natural primary key
+WITHOUT_ROWID = {
+    "chunk_mappings": ("movie_id", "chunk_id"),
+    "pipeline_checkpoints": ("stage",),
+}
+
+# Indexes for the queries in webapp/server/utils/database.ts
+INDEXES = [
+    ("idx_movies_popularity", "movies", "popularity DESC, vote_average DESC"),
+    ("idx_user_watched_movies_movie", "user_watched_movies", "movie_id"),
+    ("idx_user_watched_movies_watched_at", "user_watched_movies", "watched_at DESC"),
+]
+
+def staging_path(db_path):
+    """Staging file the pipeline writes to while building"""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.name + ".staging")
+
+def compact_path(db_path):
+    """Compacted file waiting to be renamed over the live database"""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.name + ".new")
+
+def table_exists(conn, name, schema="main"):
+    row = conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+def table_columns(conn, name, schema="main"):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({name})")]
+
+def resumable(staging):
+    """Whether a staging file holds committed stage progress to resume from"""
+    conn = sqlite3.connect(staging)
+    try:
+        return has_progress(conn)
+    finally:
+        conn.close()
+
+def create_staging(db_path, fresh=False):
+    """Create the staging database and return its path.
+
+    An existing staging file is reused so an interrupted build resumes from
+    its checkpoints; with fresh set, one without any progress is started
+    over. Otherwise the live database is copied with the online backup API,
+    which doesn't block the webapp, unless fresh is set.
+    """
+    db_path = Path(db_path)
+    staging = staging_path(db_path)
+    if fresh and staging.exists() and not resumable(staging):
+        staging.unlink()
+    if staging.exists():
+        print(f"Resuming build in {staging}")
+        return staging
+
+    target = sqlite3.connect(staging)
+    if db_path.exists() and not fresh:
+        print(f"Copying {db_path} to {staging}")
+        source = sqlite3.connect(db_path)
+        source.backup(target)
+        source.close()
+    else:
+        print(f"Starting empty build in {staging}")
+    target.close()
+    return staging
+
+def copy_live_schema(conn, live_path):
+    """Create runtime tables the staging build doesn't have yet, using the live schema"""
+    if not Path(live_path).exists():
+        return
+    conn.execute("ATTACH DATABASE ? AS live", (str(live_path),))
+    for table in LIVE_TABLES:
+        if table_exists(conn, table) or not table_exists(conn, table, "live"):
+            continue
+        sql = conn.execute(
+            "SELECT sql FROM live.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        conn.execute(sql)
+    conn.commit()
+    conn.execute("DETACH DATABASE live")
+
+def rebuild_without_rowid(conn, table, key):
+    """Rebuild a table as WITHOUT ROWID clustered on key; return True if rebuilt"""
+    if not table_exists(conn, table):
+        return False
+    sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()[0]
+    if "WITHOUT ROWID" in sql.upper():
+        return False
+
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    names = [row[1] for row in info]
+    if not set(key) <= set(names):
+        print(f"Skipping WITHOUT ROWID for {table}: no {', '.join(key)} columns")
+        return False
+
+    definitions = []
+    for _, name, type_, notnull, default, _ in info:
+        definition = f"{name} {type_}".strip()
+        if notnull or name in key:
+            definition += " NOT NULL"
+        if default is not None:
+            definition += f" DEFAULT {default}"
+        definitions.append(definition)
+    definitions.append(f"PRIMARY KEY ({', '.join(key)})")
+
+    columns = ", ".join(names)
+    conn.execute(f"CREATE TABLE {table}_rebuild ({', '.join(definitions)}) WITHOUT ROWID")
+    # Rows repeating a key would violate the new primary key; keep the first
+    conn.execute(f"INSERT OR IGNORE INTO {table}_rebuild ({columns}) SELECT {columns} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+    conn.commit()
+    return True
+
+def create_indexes(conn):
+    """Create the serving indexes for tables that exist; return how many were created"""
+    created = 0
+    for name, table, columns in INDEXES:
+        if not table_exists(conn, table):
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        created += 1
+    conn.commit()
+    return created
+
+def optimize(staging, live_path, metrics):
+    """Prepare the staging database for serving"""
+    conn = sqlite3.connect(staging)
+    copy_live_schema(conn, live_path)
+
+    with metrics.stage("without_rowid"):
+        for table, key in WITHOUT_ROWID.items():
+            if rebuild_without_rowid(conn, table, key):
+                print(f"Rebuilt {table} WITHOUT ROWID on ({', '.join(key)})")
+
+    with metrics.stage("create_indexes") as stage:
+        stage["rows"] = create_indexes(conn)
+
+    with metrics.stage("analyze"):
+        conn.execute("ANALYZE")
+        conn.commit()
+    conn.close()
+
+def vacuum_into(staging, target, page_size=PAGE_SIZE):
+    """Write a defragmented copy of staging with the given page size"""
+    if target.exists():
+        target.unlink()
+    conn = sqlite3.connect(staging)
+    # A pending page_size applies to the file VACUUM INTO writes
+    conn.execute(f"PRAGMA page_size = {page_size}")
+    conn.execute("VACUUM INTO ?", (str(target),))
+    conn.close()
+
+def copy_live_tables(conn):
+    """Replace runtime tables in main with the rows currently in the attached live file"""
+    copied = 0
+    for table in LIVE_TABLES:
+        if not table_exists(conn, table) or not table_exists(conn, table, "live"):
+            continue
+        live_columns = set(table_columns(conn, table, "live"))
+        columns = ", ".join(c for c in table_columns(conn, table) if c in live_columns)
+        conn.execute(f"DELETE FROM main.{table}")
+        cursor = conn.execute(
+            f"INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM live.{table}"
+        )
+        conn.execute(f"ANALYZE main.{table}")
+        copied += cursor.rowcount
+    return copied
+
+def check_build(path):
+    """Raise RuntimeError unless path is an intact database with movies in it"""
+    conn = sqlite3.connect(path)
+    try:
+        if not table_exists(conn, "movies"):
+            raise RuntimeError(f"{path} has no movies table; refusing to publish it")
+        if conn.execute("SELECT 1 FROM movies LIMIT 1").fetchone() is None:
+            raise RuntimeError(f"{path} has no movies; refusing to publish it")
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+        if result != "ok":
+            raise RuntimeError(f"{path} failed quick_check ({result}); refusing to publish it")
+    finally:
+        conn.close()
+
+def check_finished(path):
+    """Raise RuntimeError if a stage of the build at path was left unfinished"""
+    conn = sqlite3.connect(path)
+    try:
+        stages = unfinished_stages(conn)
+    finally:
+        conn.close()
+    if stages:
+        raise RuntimeError(f"{path} has unfinished stages ({', '.join(stages)}); "
+                           "rerun the build to resume them before publishing")
+
+def swap(compact, live_path):
+    """Copy runtime tables into compact and rename it over the live database.
+
+    A write lock on the live file is held from the copy until the rename, so
+    nothing commits to the old file after its runtime rows were copied. A
+    webapp write that was waiting on the lock fails with
+    SQLITE_READONLY_DBMOVED once the file is renamed away; writeDatabase()
+    in webapp/server/utils/database.ts retries it on the new file. Readers
+    are never blocked; open webapp connections move to the new file on their
+    next query.
+    """
+    live_path = Path(live_path)
+    if not live_path.exists():
+        os.replace(compact, live_path)
+        return 0
+
+    live = sqlite3.connect(live_path, isolation_level=None)
+    if live.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+        live.close()
+        # The -wal file belongs to the old file and must not meet the new one
+        raise RuntimeError(f"{live_path} is in WAL mode; switch it to DELETE before swapping")
+
+    live.execute("BEGIN IMMEDIATE")
+    try:
+        conn = sqlite3.connect(compact)
+        conn.execute("ATTACH DATABASE ? AS live", (str(live_path),))
+        copied = copy_live_tables(conn)
+        conn.commit()
+        conn.close()
+        os.replace(compact, live_path)
+    finally:
+        live.rollback()
+        live.close()
+    return copied
+
+def file_size_mb(path):
+    return Path(path).stat().st_size / (1024 * 1024)
+
+def publish(db_path, metrics, staging=None, page_size=PAGE_SIZE):
+    """Optimize the staging build and atomically replace the live database.
+
+    Without a staging file the live database itself is copied first, so this
+    also compacts a database in place without blocking the webapp. A build
+    without movies, with an unfinished stage or failing PRAGMA quick_check
+    is never swapped in.
+    """
+    db_path = Path(db_path)
+    if staging is not None:
+        check_finished(staging)
+    else:
+        if staging_path(db_path).exists():
+            raise RuntimeError(
+                f"{staging_path(db_path)} holds an unpublished build; "
+                "publish it with --build or delete it first"
+            )
+        # Nothing was built, so compact a fresh copy of the live file
+        staging = create_staging(db_path)
+    compact = compact_path(db_path)
+    before = file_size_mb(db_path) if db_path.exists() else 0.0
+
+    check_build(staging)
+    optimize(staging, db_path, metrics)
+    with metrics.stage("vacuum_into"):
+        vacuum_into(staging, compact, page_size)
+    check_build(compact)
+    with metrics.stage("swap") as stage:
+        stage["rows"] = swap(compact, db_path)
+    Path(staging).unlink()
+
+    after = file_size_mb(db_path)
+    metrics.increment("database_bytes", db_path.stat().st_size)
+    print(f"Published {db_path} ({before:.1f} MB -> {after:.1f} MB, page size {page_size})")
+    print(f"Copied {stage['rows']} runtime rows from the live database")
+
+def main():
+    # Paths - target webapp database
+    script_dir = Path(__file__).parent
+    webapp_dir = script_dir.parent / "webapp"
+    db_path = webapp_dir / "movies.db"
+
+    print(f"Target database: {db_path}")
+
+    # Check if webapp database exists
+    if not db_path.exists():
+        print(f"Error: Database file {db_path} not found!")
+        return
+
+    if staging_path(db_path).exists():
+        print(f"Error: {staging_path(db_path)} holds an unpublished build; "
+              "run pinestream_data.py --build publish to swap it in, or delete it first")
+        return
+
+    metrics = PipelineMetrics("build_database")
+    publish(db_path, metrics)
+    metrics.write()
+
+if __name__ == "__main__":
+    main()
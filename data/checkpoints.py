@@ -0,0 +1,116 @@
+import os
+import time
+
+# Movies processed per committed batch
+BATCH_SIZE = int(os.environ.get("PINESTREAM_BATCH_SIZE", "500"))
+
+# Set to 1 to ignore an unfinished checkpoint and start the stage over
+RESTART = os.environ.get("PINESTREAM_RESTART") == "1"
+
+def now_ms():
+    """Milliseconds since the epoch, matching Date.now() in the webapp"""
+    return int(time.time() * 1000)
+
+def create_checkpoint_table(conn):
+    """Create pipeline_checkpoints table if it doesn't exist"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+        stage TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        last_processed_id INTEGER NOT NULL DEFAULT 0,
+        processed INTEGER NOT NULL DEFAULT 0,
+        matched INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        started_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL,
+        message TEXT
+    ) WITHOUT ROWID
+    ''')
+    conn.commit()
+
+def start_stage(conn, stage, total, restart=RESTART):
+    """Start or resume a stage and return the checkpoint to continue from.
+
+    An unfinished checkpoint is resumed unless restart is set; a completed
+    one is reset so the stage runs again from the beginning. The total of a
+    resumed stage is kept from its first start.
+    Returns a dict with last_processed_id, processed and matched.
+    """
+    create_checkpoint_table(conn)
+    row = conn.execute(
+        "SELECT status, last_processed_id, processed, matched FROM pipeline_checkpoints WHERE stage = ?",
+        (stage,),
+    ).fetchone()
+
+    if row and row[0] in ("running", "interrupted") and not restart:
+        print(f"Resuming {stage} after movie id {row[1]} ({row[2]} processed)")
+        conn.execute(
+            "UPDATE pipeline_checkpoints SET status = 'running', updated_at = ?, message = ? WHERE stage = ?",
+            (now_ms(), "Resumed", stage),
+        )
+        conn.commit()
+        return {"last_processed_id": row[1], "processed": row[2], "matched": row[3]}
+
+    started = now_ms()
+    conn.execute('''
+    INSERT OR REPLACE INTO pipeline_checkpoints
+        (stage, status, last_processed_id, processed, matched, total, started_at, updated_at, message)
+    VALUES (?, 'running', 0, 0, 0, ?, ?, ?, 'Processing...')
+    ''', (stage, total, started, started))
+    conn.commit()
+    return {"last_processed_id": 0, "processed": 0, "matched": 0}
+
+def save_checkpoint(conn, stage, last_processed_id, processed, matched):
+    """Record batch progress; commit together with the batch's own writes"""
+    conn.execute('''
+    UPDATE pipeline_checkpoints
+    SET last_processed_id = ?, processed = processed + ?, matched = matched + ?, updated_at = ?
+    WHERE stage = ?
+    ''', (last_processed_id, processed, matched, now_ms(), stage))
+    conn.commit()
+
+def finish_stage(conn, stage, message):
+    """Mark a stage as completed"""
+    conn.execute(
+        "UPDATE pipeline_checkpoints SET status = 'completed', updated_at = ?, message = ? WHERE stage = ?",
+        (now_ms(), message, stage),
+    )
+    conn.commit()
+
+def fail_stage(conn, stage, error):
+    """Mark a stage as interrupted, keeping its checkpoint so it can be resumed"""
+    conn.rollback()
+    conn.execute(
+        "UPDATE pipeline_checkpoints SET status = 'interrupted', updated_at = ?, message = ? WHERE stage = ?",
+        (now_ms(), f"Interrupted: {error!r}", stage),
+    )
+    conn.commit()
+
+def checkpoint_table_exists(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pipeline_checkpoints'"
+    ).fetchone()
+    return row is not None
+
+def has_progress(conn):
+    """Whether any stage has committed a batch or finished, so there is work to resume"""
+    if not checkpoint_table_exists(conn):
+        return False
+    row = conn.execute(
+        "SELECT 1 FROM pipeline_checkpoints WHERE last_processed_id > 0 OR status = 'completed' LIMIT 1"
+    ).fetchone()
+    return row is not None
+
+def unfinished_stages(conn):
+    """Names of stages that were started but not completed"""
+    if not checkpoint_table_exists(conn):
+        return []
+    rows = conn.execute(
+        "SELECT stage FROM pipeline_checkpoints WHERE status IN ('running', 'interrupted') ORDER BY started_at"
+    )
+    return [row[0] for row in rows]
+
+def batched(rows, size=BATCH_SIZE):
+    """Yield successive lists of at most size rows"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
@@ -1,52 +1,104 @@
 import pandas as pd
 import sqlite3
 import os
+from checkpoints import batched, fail_stage, finish_stage, save_checkpoint, start_stage
+from instrumentation import PipelineMetrics
 
-# Read the parquet file
-df = pd.read_parquet('train-00000-of-00001.parquet')
-
-# Filter out rows with null titles
-df = df.dropna(subset=['Title'])
-
-# Create SQLite database
-conn = sqlite3.connect('movies.db')
-cursor = conn.cursor()
-
-# Create movies table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS movies (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    overview TEXT,
-    release_date TEXT,
-    popularity REAL,
-    vote_count INTEGER,
-    vote_average REAL,
-    original_language TEXT,
-    genre TEXT,
-    poster_url TEXT
-)
-''')
-
-# Insert data from parquet to SQLite
-for index, row in df.iterrows():
+# Checkpoint row in pipeline_checkpoints, also shown by /api/admin/progress
+CHECKPOINT_STAGE = "convert"
+
+def load_catalog(parquet_path):
+    """Read the parquet catalog and drop rows with null titles"""
+    df = pd.read_parquet(parquet_path)
+
+    # Filter out rows with null titles
+    return df.dropna(subset=['Title'])
+
+def create_movies_table(cursor):
+    """Create movies table if it doesn't exist"""
     cursor.execute('''
-    INSERT INTO movies (title, overview, release_date, popularity, vote_count, vote_average, original_language, genre, poster_url)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        row['Title'],
-        row['Overview'] if pd.notna(row['Overview']) else None,
-        row['Release_Date'] if pd.notna(row['Release_Date']) else None,
-        row['Popularity'] if pd.notna(row['Popularity']) else None,
-        row['Vote_Count'] if pd.notna(row['Vote_Count']) else None,
-        row['Vote_Average'] if pd.notna(row['Vote_Average']) else None,
-        row['Original_Language'] if pd.notna(row['Original_Language']) else None,
-        row['Genre'] if pd.notna(row['Genre']) else None,
-        row['Poster_Url'] if pd.notna(row['Poster_Url']) else None
-    ))
-
-conn.commit()
-conn.close()
-
-print(f"Successfully converted {len(df)} movies to SQLite database")
-print("Database file: movies.db") 
\ No newline at end of file
+    CREATE TABLE IF NOT EXISTS movies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        overview TEXT,
+        release_date TEXT,
+        popularity REAL,
+        vote_count INTEGER,
+        vote_average REAL,
+        original_language TEXT,
+        genre TEXT,
+        poster_url TEXT
+    )
+    ''')
+
+def movie_rows(df):
+    """Rows for the movies table, numbered from 1 in catalog order like AUTOINCREMENT on an empty table"""
+    for movie_id, (_, row) in enumerate(df.iterrows(), start=1):
+        yield (
+            movie_id,
+            row['Title'],
+            row['Overview'] if pd.notna(row['Overview']) else None,
+            row['Release_Date'] if pd.notna(row['Release_Date']) else None,
+            row['Popularity'] if pd.notna(row['Popularity']) else None,
+            row['Vote_Count'] if pd.notna(row['Vote_Count']) else None,
+            row['Vote_Average'] if pd.notna(row['Vote_Average']) else None,
+            row['Original_Language'] if pd.notna(row['Original_Language']) else None,
+            row['Genre'] if pd.notna(row['Genre']) else None,
+            row['Poster_Url'] if pd.notna(row['Poster_Url']) else None
+        )
+
+def insert_movies(cursor, rows):
+    """Insert movie rows, updating any already stored under the same id"""
+    # Keyed by id, so converting again (or resuming) never duplicates movies
+    cursor.executemany('''
+    INSERT INTO movies (id, title, overview, release_date, popularity, vote_count, vote_average, original_language, genre, poster_url)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        title = excluded.title, overview = excluded.overview, release_date = excluded.release_date,
+        popularity = excluded.popularity, vote_count = excluded.vote_count,
+        vote_average = excluded.vote_average, original_language = excluded.original_language,
+        genre = excluded.genre, poster_url = excluded.poster_url
+    ''', rows)
+
+def convert(parquet_path, db_path, metrics=None, stage=CHECKPOINT_STAGE):
+    """Convert the parquet catalog into the movies table in committed batches, resuming from the last checkpoint"""
+    metrics = metrics or PipelineMetrics("convert_data")
+
+    with metrics.stage("load_parquet") as timing:
+        df = load_catalog(parquet_path)
+        timing["rows"] = len(df)
+    rows = list(movie_rows(df))
+
+    # Create SQLite database
+    with metrics.stage("insert_movies", rows=len(df)):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        create_movies_table(cursor)
+        checkpoint = start_stage(conn, stage, len(rows))
+        remaining = [row for row in rows if row[0] > checkpoint["last_processed_id"]]
+
+        try:
+            for batch in batched(remaining):
+                insert_movies(cursor, batch)
+                # The checkpoint commits together with the batch's movies
+                save_checkpoint(conn, stage, batch[-1][0], len(batch), len(batch))
+        except BaseException as e:
+            fail_stage(conn, stage, e)
+            conn.close()
+            raise
+
+        finish_stage(conn, stage, f"Completed! Converted {len(rows)} movies.")
+        conn.close()
+    return len(df)
+
+def main():
+    metrics = PipelineMetrics("convert_data")
+    count = convert('train-00000-of-00001.parquet', 'movies.db', metrics)
+
+    print(f"Successfully converted {count} movies to SQLite database")
+    print("Database file: movies.db")
+
+    metrics.write()
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ import csv
 import os
 import glob
 from pathlib import Path
+from instrumentation import PipelineMetrics
+from match_cache import BACKFILL_SCOPE, CACHE_PATH, MatchCache
+from title_matching import FUZZY_ACCEPT
 
 def load_csv_data(csv_files):
     """Load all plot data from CSV files"""
@@ -24,19 +27,21 @@ def load_csv_data(csv_files):
     
     return plot_data
 
-def analyze_matching():
+def analyze_matching(db_path=None, plot_data=None):
+    """Compare CSV and database titles; reuses plot_data when already loaded"""
     # Paths
     script_dir = Path(__file__).parent
     webapp_dir = script_dir.parent / "webapp"
-    db_path = webapp_dir / "movies.db"
+    db_path = db_path or webapp_dir / "movies.db"
     csv_pattern = script_dir / "*.csv"
     
-    # Get CSV files
-    csv_files = glob.glob(str(csv_pattern))
-    csv_files = [f for f in csv_files if os.path.basename(f).endswith('.csv')]
-    
-    # Load CSV data
-    plot_data = load_csv_data(csv_files)
+    if plot_data is None:
+        # Get CSV files
+        csv_files = glob.glob(str(csv_pattern))
+        csv_files = [f for f in csv_files if os.path.basename(f).endswith('.csv')]
+        
+        # Load CSV data
+        plot_data = load_csv_data(csv_files)
     csv_titles = set(plot_data.keys())
     csv_titles_lower = {title.lower() for title in csv_titles}
     
@@ -100,6 +105,42 @@ def analyze_matching():
     print(f"\nDB titles with years (first 5):")
     for title in list(db_with_years)[:5]:
         print(f"  '{title}'")
+    
+    analyze_cached_decisions(db_titles, plot_data)
+
+def analyze_cached_decisions(db_titles, plot_data):
+    """Summarize the backfill's cached decisions instead of repeating its comparisons"""
+    print(f"\n=== CACHED DECISIONS ===")
+    if not CACHE_PATH.exists():
+        print("No match cache yet; run the backfill first")
+        return
+    
+    cache = MatchCache(plot_data, BACKFILL_SCOPE)
+    decisions = cache.decisions()
+    cache.conn.close()
+    decided = {title: decisions[title] for title in db_titles if title in decisions}
+    print(f"Decided titles: {len(decided)} of {len(db_titles)} (undecided: {len(db_titles) - len(decided)})")
+    
+    by_strategy = {}
+    for strategy, _, _ in decided.values():
+        by_strategy[strategy] = by_strategy.get(strategy, 0) + 1
+    for strategy, count in sorted(by_strategy.items(), key=lambda item: -item[1]):
+        print(f"  {strategy or 'no match'}: {count}")
+    
+    # Non-matches the fuzzy pass scored closest to the acceptance threshold
+    near_misses = sorted(
+        ((score, title, key) for title, (strategy, key, score) in decided.items() if strategy is None and score),
+        reverse=True,
+    )
+    print(f"\nNear misses below {FUZZY_ACCEPT} (first 10):")
+    for score, title, key in near_misses[:10]:
+        print(f"  '{title}' ~ '{key}' ({score:.3f})")
+
+def main():
+    metrics = PipelineMetrics("debug_matching")
+    with metrics.stage("analyze_matching"):
+        analyze_matching()
+    metrics.write()
 
 if __name__ == "__main__":
-    analyze_matching() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import sqlite3
+import re
+import zlib
+import math
+from pathlib import Path
+from instrumentation import PipelineMetrics
+
+# MinHash / LSH parameters
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+NUM_BANDS = 16
+SIMILARITY_THRESHOLD = 0.85
+
+# Mirrors DEFAULT_SPLITTER_CONFIG in webapp/server/utils/text-splitter.ts
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 300
+
+# Largest 32-bit hash value, used for empty signature slots
+MAX_HASH = (1 << 32) - 1
+
+def create_plot_clusters_table(conn):
+    """Create plot_clusters table if it doesn't exist"""
+    cursor = conn.cursor()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS plot_clusters (
+        movie_id INTEGER PRIMARY KEY,
+        cluster_id INTEGER NOT NULL,
+        canonical_movie_id INTEGER NOT NULL,
+        similarity REAL NOT NULL,
+        FOREIGN KEY (movie_id) REFERENCES movies(id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_plot_clusters_canonical
+    ON plot_clusters (canonical_movie_id)
+    ''')
+    conn.commit()
+
+def get_movies_with_plots(db_path):
+    """Get all movies that have a plot"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, plot FROM movies WHERE plot IS NOT NULL AND plot != '' ORDER BY id")
+    movies = cursor.fetchall()
+    conn.close()
+    return movies
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """Hash the word k-shingles of a plot into a set of 32-bit integers"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < k:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {
+        zlib.crc32(' '.join(words[i:i + k]).encode('utf-8'))
+        for i in range(len(words) - k + 1)
+    }
+
+def minhash_signature(hashes, num_perm=NUM_PERM):
+    """Build a one-permutation MinHash signature with rotation densification.
+
+    Every shingle hash is hashed once and routed to one of num_perm bins, so
+    the cost is linear in the number of shingles instead of num_perm times it.
+    Empty bins borrow the value of the next non-empty bin to the right.
+    """
+    bins = [MAX_HASH] * num_perm
+    for h in hashes:
+        # Mix the bits so bin assignment doesn't depend on crc32 low bits only
+        h = (h * 0x9E3779B1) & MAX_HASH
+        index = h % num_perm
+        value = h // num_perm
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == MAX_HASH for value in bins):
+        return tuple(bins)
+
+    signature = list(bins)
+    for i in range(num_perm):
+        if bins[i] != MAX_HASH:
+            continue
+        offset = 1
+        while bins[(i + offset) % num_perm] == MAX_HASH:
+            offset += 1
+        signature[i] = bins[(i + offset) % num_perm] + offset * (MAX_HASH // num_perm)
+    return tuple(signature)
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimate Jaccard similarity from two MinHash signatures"""
+    equal = sum(1 for a, b in zip(sig_a, sig_b) if a == b)
+    return equal / len(sig_a)
+
+def find_candidate_pairs(signatures, num_bands=NUM_BANDS):
+    """Bucket signatures by LSH band and return candidate movie id pairs"""
+    rows = len(next(iter(signatures.values()))) // num_bands
+    candidates = set()
+
+    for band in range(num_bands):
+        buckets = {}
+        start = band * rows
+        for movie_id, signature in signatures.items():
+            key = signature[start:start + rows]
+            buckets.setdefault(key, []).append(movie_id)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    candidates.add((members[i], members[j]))
+
+    return candidates
+
+def cluster_near_duplicates(movies, threshold=SIMILARITY_THRESHOLD):
+    """Group movies with near-duplicate plots.
+
+    Returns a list of clusters, each a sorted list of movie ids with at least
+    two members. The lowest movie id in a cluster is its canonical copy.
+    """
+    # Identical plots are grouped up front without hashing shingles
+    by_text = {}
+    for movie_id, plot in movies:
+        by_text.setdefault(plot.strip(), []).append(movie_id)
+
+    signatures = {}
+    representatives = {}
+    for text, movie_ids in by_text.items():
+        representative = movie_ids[0]
+        signatures[representative] = minhash_signature(shingle_hashes(text))
+        representatives[representative] = movie_ids
+
+    parent = {movie_id: movie_id for movie_id in signatures}
+
+    def find(movie_id):
+        while parent[movie_id] != movie_id:
+            parent[movie_id] = parent[parent[movie_id]]
+            movie_id = parent[movie_id]
+        return movie_id
+
+    for a, b in find_candidate_pairs(signatures):
+        if estimate_similarity(signatures[a], signatures[b]) >= threshold:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = {}
+    for representative, movie_ids in representatives.items():
+        groups.setdefault(find(representative), []).extend(movie_ids)
+
+    clusters = [sorted(members) for members in groups.values() if len(members) > 1]
+    clusters.sort(key=lambda members: members[0])
+    return clusters, signatures, representatives
+
+def estimate_chunk_count(text):
+    """Estimate how many chunks the webapp text splitter produces for a plot"""
+    length = len(text)
+    if length <= CHUNK_SIZE:
+        return 1
+    return math.ceil((length - CHUNK_OVERLAP) / (CHUNK_SIZE - CHUNK_OVERLAP))
+
+def save_plot_clusters(db_path, clusters, signatures, representatives):
+    """Replace the contents of plot_clusters with the given clusters"""
+    # Map every movie back to the representative holding its signature
+    signature_of = {}
+    for representative, movie_ids in representatives.items():
+        for movie_id in movie_ids:
+            signature_of[movie_id] = signatures[representative]
+
+    conn = sqlite3.connect(db_path)
+    create_plot_clusters_table(conn)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM plot_clusters")
+
+    rows = []
+    for cluster_id, members in enumerate(clusters, start=1):
+        canonical = members[0]
+        for movie_id in members:
+            similarity = estimate_similarity(signature_of[movie_id], signature_of[canonical])
+            rows.append((movie_id, cluster_id, canonical, similarity))
+
+    cursor.executemany('''
+    INSERT INTO plot_clusters (movie_id, cluster_id, canonical_movie_id, similarity)
+    VALUES (?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+def report_savings(movies, clusters):
+    """Print how many plot embeddings the clusters save"""
+    plots = dict(movies)
+    duplicate_movies = 0
+    saved_chunks = 0
+    for members in clusters:
+        for movie_id in members[1:]:
+            duplicate_movies += 1
+            saved_chunks += estimate_chunk_count(plots[movie_id])
+
+    print(f"\n=== NEAR-DUPLICATE PLOT ANALYSIS ===")
+    print(f"Movies with plots: {len(movies)}")
+    print(f"Near-duplicate clusters: {len(clusters)}")
+    print(f"Movies sharing a canonical plot: {duplicate_movies}")
+    print(f"Plot chunks skipped per index: {saved_chunks}")
+    print(f"Embeddings saved (dense + sparse): {saved_chunks * 2}")
+
+    print(f"\nSample clusters:")
+    for members in clusters[:5]:
+        print(f"  canonical {members[0]} <- {members[1:]}")
+
+    return saved_chunks
+
+def dedupe(db_path, metrics):
+    """Cluster near-duplicate plots and store them in plot_clusters"""
+    with metrics.stage("load_plots") as stage:
+        movies = get_movies_with_plots(db_path)
+        stage["rows"] = len(movies)
+    if not movies:
+        print("No movies with plots found. Run the plot backfill scripts first.")
+        return
+
+    with metrics.stage("cluster", rows=len(movies)):
+        clusters, signatures, representatives = cluster_near_duplicates(movies)
+
+    with metrics.stage("save_clusters") as stage:
+        saved = save_plot_clusters(db_path, clusters, signatures, representatives)
+        stage["rows"] = saved
+    print(f"Saved {saved} rows to plot_clusters")
+
+    saved_chunks = report_savings(movies, clusters)
+    metrics.increment("clusters", len(clusters))
+    metrics.increment("plot_chunks_saved", saved_chunks)
+
+def main():
+    # Paths - target webapp database
+    script_dir = Path(__file__).parent
+    webapp_dir = script_dir.parent / "webapp"
+    db_path = webapp_dir / "movies.db"
+
+    print(f"Target database: {db_path}")
+
+    # Check if webapp database exists
+    if not db_path.exists():
+        print(f"Error: Database file {db_path} not found!")
+        return
+
+    metrics = PipelineMetrics("dedupe_plots")
+    dedupe(db_path, metrics)
+    metrics.write()
+
+if __name__ == "__main__":
+    main()
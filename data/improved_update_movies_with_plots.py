@@ -5,6 +5,7 @@ import os
 import glob
 import re
 from pathlib import Path
+from instrumentation import PipelineMetrics
 
 def add_plot_column(db_path):
     """Add plot column to movies table if it doesn't exist"""
@@ -59,7 +60,7 @@ def load_csv_data(csv_files):
     print(f"Normalized titles: {len(normalized_plot_data)}")
     return plot_data, normalized_plot_data
 
-def update_database(db_path, plot_data, normalized_plot_data):
+def update_database(db_path, plot_data, normalized_plot_data, metrics=None):
     """Update database with plot data using improved matching"""
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -73,20 +74,24 @@ def update_database(db_path, plot_data, normalized_plot_data):
     
     for movie_id, db_title in movies:
         plot = None
+        match_type = None
         
         # Try exact match first
         if db_title in plot_data:
             plot = plot_data[db_title]
+            match_type = "exact"
         
         # Try normalized match
         elif normalize_title(db_title) in normalized_plot_data:
             plot = normalized_plot_data[normalize_title(db_title)]
+            match_type = "normalized"
         
         # Try case-insensitive exact match
         elif db_title.lower() in {title.lower() for title in plot_data}:
             for csv_title, csv_plot in plot_data.items():
                 if csv_title.lower() == db_title.lower():
                     plot = csv_plot
+                    match_type = "case_insensitive"
                     break
         
         # Try case-insensitive normalized match
@@ -94,16 +99,23 @@ def update_database(db_path, plot_data, normalized_plot_data):
             for csv_title, csv_plot in normalized_plot_data.items():
                 if csv_title.lower() == normalize_title(db_title).lower():
                     plot = csv_plot
+                    match_type = "case_insensitive_normalized"
                     break
         
         if plot:
             cursor.execute("UPDATE movies SET plot = ? WHERE id = ?", (plot, movie_id))
             updated_count += 1
             matched_count += 1
+            if metrics:
+                metrics.record_match(match_type)
     
     conn.commit()
     conn.close()
     
+    if metrics:
+        metrics.increment("movies_scanned", len(movies))
+        metrics.increment("movies_updated", updated_count)
+    
     print(f"Updated {updated_count} movies with plot data")
     print(f"Matched {matched_count} movies out of {len(movies)} total movies")
 
@@ -156,19 +168,29 @@ def main():
         print(f"Error: Database file {db_path} not found!")
         return
     
+    metrics = PipelineMetrics("improved_update_movies_with_plots")
+    
     # Add plot column
-    add_plot_column(db_path)
+    with metrics.stage("add_plot_column"):
+        add_plot_column(db_path)
     
     # Load plot data from CSV files with normalization
-    plot_data, normalized_plot_data = load_csv_data(csv_files)
+    with metrics.stage("load_csv") as stage:
+        plot_data, normalized_plot_data = load_csv_data(csv_files)
+        stage["rows"] = len(plot_data)
     
     # Analyze improved matching
-    analyze_improved_matching(db_path, plot_data, normalized_plot_data)
+    with metrics.stage("analyze"):
+        analyze_improved_matching(db_path, plot_data, normalized_plot_data)
     
     # Update database
-    update_database(db_path, plot_data, normalized_plot_data)
+    with metrics.stage("update_database") as stage:
+        update_database(db_path, plot_data, normalized_plot_data, metrics)
+        stage["rows"] = metrics.counters["movies_scanned"]
     
     print("Database update completed!")
+    
+    metrics.write()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,185 @@
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+# Where run records are written, relative to this directory unless absolute
+METRICS_DIR = os.environ.get("PINESTREAM_METRICS_DIR", "metrics")
+
+# Name of a single stage to profile with cProfile, e.g. "find_matches"
+PROFILE_STAGE = os.environ.get("PINESTREAM_PROFILE_STAGE")
+
+# Set to 1 to record tracemalloc snapshots (slows allocation-heavy stages)
+TRACE_MEMORY = os.environ.get("PINESTREAM_TRACE_MEMORY") == "1"
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB; it never goes down"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def current_rss_kb():
+    """Current resident set size of this process in KiB, or None without /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+def rss_delta_kb(before):
+    """Change in resident set size since a current_rss_kb() reading, or None"""
+    after = current_rss_kb()
+    return None if before is None or after is None else after - before
+
+class PipelineMetrics:
+    """Collects stage timings, memory and match statistics for one script run.
+
+    Usage:
+        metrics = PipelineMetrics("ultimate_plot_extraction")
+        with metrics.stage("load_csv") as stage:
+            plot_data = load(...)
+            stage["rows"] = len(plot_data)
+        metrics.write()
+    """
+
+    def __init__(self, pipeline, metrics_dir=None, profile_stage=None, trace_memory=None):
+        self.pipeline = pipeline
+        self.started_at = time.time()
+        self.metrics_dir = Path(metrics_dir or METRICS_DIR)
+        if not self.metrics_dir.is_absolute():
+            self.metrics_dir = Path(__file__).parent / self.metrics_dir
+        self.profile_stage = profile_stage if profile_stage is not None else PROFILE_STAGE
+        self.trace_memory = TRACE_MEMORY if trace_memory is None else trace_memory
+        self.stages = {}
+        self.strategies = {}
+        self.counters = {}
+        self.profile_path = None
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time a stage; set stage["rows"] inside the block to get rows/sec"""
+        record = {"rows": rows}
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        if self.trace_memory:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        rss_before = current_rss_kb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+                self.profile_path = self._output_path(f"{name}.prof")
+                self.profile_path.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self.profile_path)
+            record["seconds"] = round(seconds, 6)
+            # What the stage left resident; peak_alloc_kb (with tracing) is its own peak
+            record["rss_delta_kb"] = rss_delta_kb(rss_before)
+            record["process_peak_rss_kb"] = peak_rss_kb()
+            if self.trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                record["peak_alloc_kb"] = peak // 1024
+                record["top_allocations"] = [
+                    {"location": str(stat.traceback), "size_kb": stat.size // 1024}
+                    for stat in snapshot.statistics("lineno")[:5]
+                ]
+            if record["rows"] is not None and seconds > 0:
+                record["rows_per_sec"] = round(record["rows"] / seconds, 1)
+            self.stages[name] = record
+
+    def record_strategy(self, strategy, seconds, matched):
+        """Record one lookup attempt for a matching strategy"""
+        stats = self.strategies.setdefault(strategy, {"attempts": 0, "matches": 0, "seconds": 0.0})
+        stats["attempts"] += 1
+        stats["seconds"] += seconds
+        if matched:
+            stats["matches"] += 1
+
+    def record_match(self, strategy):
+        """Record a match for a strategy whose lookups are not timed individually"""
+        stats = self.strategies.setdefault(strategy, {"attempts": 0, "matches": 0, "seconds": 0.0})
+        stats["matches"] += 1
+
+    def increment(self, counter, amount=1):
+        """Increment a free-form counter such as rows updated"""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def summary(self):
+        """Return the run record as a JSON-serialisable dict"""
+        strategies = {}
+        for name, stats in self.strategies.items():
+            strategies[name] = dict(stats, seconds=round(stats["seconds"], 6))
+            if stats["attempts"]:
+                strategies[name]["avg_latency_us"] = round(stats["seconds"] / stats["attempts"] * 1e6, 3)
+
+        return {
+            "pipeline": self.pipeline,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "total_seconds": round(time.time() - self.started_at, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": self.stages,
+            "strategies": strategies,
+            "counters": self.counters,
+            "profile": str(self.profile_path) if self.profile_path else None,
+        }
+
+    def to_openmetrics(self):
+        """Render the run record in OpenMetrics text format"""
+        label = f'pipeline="{self.pipeline}"'
+        lines = [
+            "# TYPE pinestream_stage_seconds gauge",
+            *(f'pinestream_stage_seconds{{{label},stage="{name}"}} {stage["seconds"]}'
+              for name, stage in self.stages.items()),
+            "# TYPE pinestream_stage_rows gauge",
+            *(f'pinestream_stage_rows{{{label},stage="{name}"}} {stage["rows"]}'
+              for name, stage in self.stages.items() if stage["rows"] is not None),
+            "# TYPE pinestream_stage_rss_delta_bytes gauge",
+            *(f'pinestream_stage_rss_delta_bytes{{{label},stage="{name}"}} {stage["rss_delta_kb"] * 1024}'
+              for name, stage in self.stages.items() if stage["rss_delta_kb"] is not None),
+            "# TYPE pinestream_strategy_matches counter",
+            *(f'pinestream_strategy_matches_total{{{label},strategy="{name}"}} {stats["matches"]}'
+              for name, stats in self.strategies.items()),
+            "# TYPE pinestream_strategy_seconds counter",
+            *(f'pinestream_strategy_seconds_total{{{label},strategy="{name}"}} {stats["seconds"]:.6f}'
+              for name, stats in self.strategies.items()),
+            "# TYPE pinestream_counter counter",
+            *(f'pinestream_counter_total{{{label},counter="{name}"}} {value}'
+              for name, value in self.counters.items()),
+            "# TYPE pinestream_peak_rss_bytes gauge",
+            f"pinestream_peak_rss_bytes{{{label}}} {peak_rss_kb() * 1024}",
+            "# EOF",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _output_path(self, suffix):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        return self.metrics_dir / f"{self.pipeline}-{stamp}-{suffix}"
+
+    def write(self):
+        """Write the run record as JSON and OpenMetrics files and print a summary"""
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        json_path = self._output_path("metrics.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(self._output_path("metrics.prom"), "w", encoding="utf-8") as f:
+            f.write(self.to_openmetrics())
+
+        print(f"\n=== PERFORMANCE ===")
+        for name, stage in self.stages.items():
+            rate = f", {stage['rows_per_sec']} rows/s" if "rows_per_sec" in stage else ""
+            memory = f", RSS {stage['rss_delta_kb']:+d} KiB" if stage["rss_delta_kb"] is not None else ""
+            print(f"{name}: {stage['seconds']:.3f}s{rate}{memory}")
+        print(f"Process peak RSS: {peak_rss_kb()} KiB")
+        print(f"Metrics written to {json_path}")
+        return json_path
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Replay a realistic query mix against a running webapp and report latency.
+
+Queries are derived from the catalog: title words for keyword search, plot
+phrases with genres and decades for semantic search, and movies with plots
+for similar-movie pages. Run the webapp against the stand-ins from
+standin_services.py (or pass --standins to start them here) so results
+reflect the webapp rather than remote API latency.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_BASE_URL = "http://localhost:3000"
+DEFAULT_CONCURRENCY = [1, 4, 16]
+
+# Relative weight of each workload in the replayed mix
+DEFAULT_MIX = {"search": 4, "semantic": 2, "similar": 3, "recommendations": 1}
+
+DECADES = ["70s", "80s", "90s", "2000s", "2010s"]
+SEMANTIC_TEMPLATES = [
+    "{phrase}",
+    "{genre} movies where {phrase}",
+    "{genre} from the {decade} about {phrase}",
+    "something like {title}",
+]
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def load_catalog(db_path, sample_size, seed):
+    """Sample movies and the ids that have chunk mappings from the database"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    movies = conn.execute('''
+    SELECT id, title, genre, plot, overview FROM movies
+    WHERE title IS NOT NULL
+    ''').fetchall()
+    has_mappings = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunk_mappings'"
+    ).fetchone()
+    embedded = []
+    if has_mappings:
+        embedded = [row[0] for row in conn.execute("SELECT DISTINCT movie_id FROM chunk_mappings")]
+    conn.close()
+
+    rng = random.Random(seed)
+    if len(movies) > sample_size:
+        movies = rng.sample(movies, sample_size)
+    return movies, embedded
+
+def plot_phrase(rng, text, min_words=4, max_words=8):
+    """A short span of words from a plot or overview"""
+    words = re.findall(r"[A-Za-z']+", text or "")
+    if len(words) < min_words:
+        return None
+    length = rng.randint(min_words, min(max_words, len(words)))
+    start = rng.randint(0, len(words) - length)
+    return " ".join(words[start:start + length]).lower()
+
+def build_requests(movies, mix, count, seed):
+    """Build count (workload, method, path, body) requests in mix proportions"""
+    rng = random.Random(seed)
+    # Blank titles can't make a search term or a fallback description
+    movies = [m for m in movies if m[1].split()]
+    with_text = [m for m in movies if m[3] or m[4]]
+    workloads = list(mix)
+    weights = [mix[name] for name in workloads]
+
+    requests = []
+    for _ in range(count):
+        workload = rng.choices(workloads, weights)[0]
+        movie_id, title, genre, plot, overview = rng.choice(with_text or movies)
+        if workload == "search":
+            words = title.split()
+            term = " ".join(words[:rng.randint(1, min(2, len(words)))])
+            path = "/api/search?" + urllib.parse.urlencode({"q": term, "limit": 20})
+            requests.append((workload, "GET", path, None))
+        elif workload == "semantic":
+            template = rng.choice(SEMANTIC_TEMPLATES)
+            description = template.format(
+                phrase=plot_phrase(rng, plot or overview) or title,
+                genre=(genre or "drama").split(",")[0].strip().lower(),
+                decade=rng.choice(DECADES),
+                title=title,
+            )
+            requests.append((workload, "POST", "/api/search/semantic",
+                             {"description": description, "limit": 20}))
+        elif workload == "similar":
+            requests.append((workload, "GET", f"/api/movies/{movie_id}/similar", None))
+        else:
+            requests.append((workload, "GET", "/api/user/recommendations", None))
+    return requests
+
+def send(base_url, method, path, body, timeout):
+    """Send one request; return (seconds, error or None)"""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        request.add_header("Content-Type", "application/json")
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+        seconds = time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, f"HTTP {e.code}"
+    except (urllib.error.URLError, OSError) as e:
+        return time.perf_counter() - start, type(e).__name__
+
+    # Endpoints report missing services in a 200 body rather than a status
+    try:
+        result = json.loads(payload)
+    except ValueError:
+        return seconds, "invalid JSON"
+    if isinstance(result, dict) and result.get("error"):
+        return seconds, str(result["error"])
+    return seconds, None
+
+def run_level(base_url, requests, concurrency, duration, timeout):
+    """Replay requests with concurrency workers until done or out of time"""
+    samples = []
+    lock = threading.Lock()
+    position = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            with lock:
+                index = position[0]
+                position[0] += 1
+            if not duration and index >= len(requests):
+                return
+            workload, method, path, body = requests[index % len(requests)]
+            seconds, error = send(base_url, method, path, body, timeout)
+            with lock:
+                samples.append((workload, seconds, error))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        workers = [pool.submit(worker) for _ in range(concurrency)]
+    for future in workers:
+        future.result()
+    elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def summarize(samples, elapsed):
+    """Latency percentiles, throughput and error rate per workload"""
+    by_workload = {}
+    for workload, seconds, error in samples:
+        by_workload.setdefault(workload, []).append((seconds, error))
+
+    summary = {}
+    for workload, results in sorted(by_workload.items()):
+        latencies = sorted(seconds * 1000 for seconds, _ in results)
+        errors = {}
+        for _, error in results:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+        failed = sum(errors.values())
+        summary[workload] = {
+            "requests": len(results),
+            "errors": failed,
+            "error_rate": round(failed / len(results), 4),
+            "error_kinds": errors,
+            "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+    summary["total"] = {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, error in samples if error),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "seconds": round(elapsed, 3),
+    }
+    return summary
+
+def print_summary(concurrency, summary):
+    print(f"\n=== CONCURRENCY {concurrency} ===")
+    print(f"{'endpoint':<16}{'reqs':>7}{'err%':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for workload, stats in summary.items():
+        if workload == "total":
+            continue
+        print(f"{workload:<16}{stats['requests']:>7}{stats['error_rate']:>7.1%}"
+              f"{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+        for kind, count in stats["error_kinds"].items():
+            print(f"  {count} x {kind}")
+    total = summary["total"]
+    print(f"Total: {total['requests']} requests, {total['errors']} errors, "
+          f"{total['throughput_rps']} req/s over {total['seconds']}s")
+
+def mark_watched(base_url, movie_ids, timeout):
+    """Add movies to the watched list; return the ids this run added"""
+    added = []
+    for movie_id in movie_ids:
+        request = urllib.request.Request(
+            f"{base_url}/api/user/watched", method="POST",
+            data=json.dumps({"movieId": movie_id}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if json.load(response).get("message") == "Movie added to watched list":
+                added.append(movie_id)
+    return added
+
+def unmark_watched(base_url, movie_ids, timeout):
+    for movie_id in movie_ids:
+        request = urllib.request.Request(
+            f"{base_url}/api/user/watched", method="DELETE",
+            data=json.dumps({"movieId": movie_id}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request, timeout=timeout).close()
+
+def parse_mix(values):
+    mix = dict(DEFAULT_MIX)
+    for value in values or []:
+        name, _, weight = value.partition("=")
+        if name not in DEFAULT_MIX or not weight:
+            raise SystemExit(f"--mix expects name=weight with name in {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def main(argv=None):
+    default_db = Path(__file__).parent.parent / "webapp" / "movies.db"
+    parser = argparse.ArgumentParser(description="Load test the webapp search and recommendation endpoints")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--db", default=str(default_db), help="catalog to derive queries from")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--duration", type=float,
+                        help="seconds per concurrency level (overrides --requests)")
+    parser.add_argument("--mix", nargs="+", metavar="NAME=WEIGHT",
+                        help=f"workload weights, default {' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests before each run")
+    parser.add_argument("--watched", type=int, default=5,
+                        help="embedded movies to mark watched for recommendations")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--standins", action="store_true",
+                        help="start the stand-in services in this process")
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args(argv)
+
+    if not Path(args.db).exists():
+        print(f"Error: Database file {args.db} not found!")
+        sys.exit(1)
+
+    if args.standins:
+        import standin_services
+        _, environment = standin_services.start_standins(args.db)
+        print("Stand-ins running; the webapp must be started with:")
+        for key, value in environment.items():
+            print(f"  {key}={value}")
+
+    mix = parse_mix(args.mix)
+    movies, embedded = load_catalog(args.db, 5000, args.seed)
+    count = args.requests if not args.duration else max(args.requests, 1000)
+    requests = build_requests(movies, mix, count, args.seed)
+    print(f"Replaying {len(requests)} requests from {len(movies)} catalog movies against {args.base_url}")
+
+    added = []
+    if "recommendations" in mix:
+        if not embedded:
+            print("Warning: chunk_mappings is empty, so recommendations return early. "
+                  "Run the embed stage against the stand-ins first.")
+        else:
+            rng = random.Random(args.seed)
+            added = mark_watched(args.base_url, rng.sample(embedded, min(args.watched, len(embedded))),
+                                 args.timeout)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "base_url": args.base_url,
+            "db": str(args.db),
+            "mix": mix,
+            "seed": args.seed,
+            "standins": args.standins,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "levels": {},
+    }
+    try:
+        if args.warmup:
+            run_level(args.base_url, requests[:args.warmup], min(4, args.warmup), None, args.timeout)
+        for concurrency in args.concurrency:
+            samples, elapsed = run_level(args.base_url, requests, concurrency, args.duration, args.timeout)
+            summary = summarize(samples, elapsed)
+            print_summary(concurrency, summary)
+            results["levels"][str(concurrency)] = summary
+    finally:
+        if added:
+            unmark_watched(args.base_url, added, args.timeout)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Persistent cache of title match decisions.
+
+Each decision maps a database title to the index key it resolved to, the
+strategy that matched and a score, or records that nothing matched. Repeat
+runs look the title up here before trying the strategies or the fuzzy pass.
+
+Decisions are stored under a version that hashes title_matching.py, which
+holds every rule the scopes apply (exact, strategy and fuzzy matching), the
+scope and the set of CSV titles, so editing a rule or adding a CSV makes old
+decisions unreachable. Keep matching rules in title_matching.py for that
+reason. The table is bounded
+and the least recently used decisions are evicted first, which also clears
+out old versions.
+
+The cache lives in its own file rather than movies.db so it survives fresh
+--build runs that recreate the database.
+"""
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+import title_matching
+from checkpoints import now_ms
+
+# Cache file shared by every matching script
+CACHE_PATH = Path(os.environ.get("PINESTREAM_MATCH_CACHE", Path(__file__).parent / "match_cache.db"))
+
+# Decisions kept before the least recently used are evicted
+MAX_ROWS = int(os.environ.get("PINESTREAM_MATCH_CACHE_ROWS", "200000"))
+
+# Scopes: exact and case-insensitive import, and the full strategy and fuzzy backfill
+IMPORT_SCOPE = "import"
+BACKFILL_SCOPE = "backfill"
+
+def rules_version(plot_data, scope):
+    """Hash the matching rules, the scope and the CSV titles into a version string"""
+    digest = hashlib.sha1(scope.encode())
+    digest.update(Path(title_matching.__file__).read_bytes())
+    for title in sorted(plot_data):
+        digest.update(title.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+def create_cache_table(conn):
+    """Create match_decisions table if it doesn't exist"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS match_decisions (
+        version TEXT NOT NULL,
+        db_title TEXT NOT NULL,
+        strategy TEXT,
+        csv_key TEXT,
+        score REAL,
+        last_used INTEGER NOT NULL,
+        PRIMARY KEY (version, db_title)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_match_decisions_last_used ON match_decisions (last_used)")
+    conn.commit()
+
+class MatchCache:
+    """Decisions for one scope and CSV title set.
+
+    lookup() returns (strategy, csv_key, score) or None when the title hasn't
+    been decided; a known non-match has strategy None. New decisions and hits
+    are written by flush(), which callers run once per batch.
+    """
+
+    def __init__(self, plot_data, scope, path=None, max_rows=MAX_ROWS):
+        self.path = Path(path or CACHE_PATH)
+        self.max_rows = max_rows
+        self.version = rules_version(plot_data, scope)
+        self.conn = sqlite3.connect(self.path)
+        create_cache_table(self.conn)
+        self.hits = 0
+        self.misses = 0
+        # Decisions made this run, so repeated titles skip the database too
+        self._decided = {}
+        self._pending = []
+        self._used = set()
+
+    def lookup(self, db_title):
+        decision = self._decided.get(db_title)
+        if decision is None:
+            decision = self.conn.execute(
+                "SELECT strategy, csv_key, score FROM match_decisions WHERE version = ? AND db_title = ?",
+                (self.version, db_title),
+            ).fetchone()
+            if decision is not None:
+                self._decided[db_title] = decision
+                self._used.add(db_title)
+        if decision is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return decision
+
+    def store(self, db_title, strategy=None, csv_key=None, score=None):
+        """Record a decision; leave strategy None for a known non-match"""
+        self._decided[db_title] = (strategy, csv_key, score)
+        self._pending.append((self.version, db_title, strategy, csv_key, score))
+
+    def flush(self):
+        """Write new decisions, mark hits as recently used and evict past the bound"""
+        used = now_ms()
+        self.conn.executemany('''
+        INSERT OR REPLACE INTO match_decisions (version, db_title, strategy, csv_key, score, last_used)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', [row + (used,) for row in self._pending])
+        self.conn.executemany(
+            "UPDATE match_decisions SET last_used = ? WHERE version = ? AND db_title = ?",
+            [(used, self.version, title) for title in self._used],
+        )
+        self._pending = []
+        self._used = set()
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        """Delete the least recently used decisions beyond max_rows; return how many"""
+        count = self.conn.execute("SELECT COUNT(*) FROM match_decisions").fetchone()[0]
+        excess = count - self.max_rows
+        if excess <= 0:
+            return 0
+        self.conn.execute('''
+        DELETE FROM match_decisions WHERE (version, db_title) IN (
+            SELECT version, db_title FROM match_decisions ORDER BY last_used LIMIT ?
+        )
+        ''', (excess,))
+        return excess
+
+    def decisions(self):
+        """All stored decisions of this version as {db_title: (strategy, csv_key, score)}"""
+        rows = self.conn.execute(
+            "SELECT db_title, strategy, csv_key, score FROM match_decisions WHERE version = ?",
+            (self.version,),
+        )
+        return {title: (strategy, csv_key, score) for title, strategy, csv_key, score in rows}
+
+    def close(self, metrics=None):
+        self.flush()
+        self.conn.close()
+        if metrics:
+            metrics.increment("match_cache_hits", self.hits)
+            metrics.increment("match_cache_misses", self.misses)
+        print(f"Match cache: {self.hits} hits, {self.misses} misses ({self.path.name})")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""pinestream-data: one entry point for the data pipeline.
+
+Stages run in the order given and share loaded data in memory, e.g.
+
+    python pinestream_data.py convert backfill chunk context
+    python pinestream_data.py analyze
+    python pinestream_data.py embed --base-url http://localhost:3000
+    python pinestream_data.py bench --sizes 10000 100000
+    python pinestream_data.py --build convert backfill chunk context publish
+    python pinestream_data.py load --concurrency 1 8 32 --duration 30
+    python pinestream_data.py snapshot --arrow
+    python pinestream_data.py --build restore publish
+
+With --build the stages write to a staging copy of the database and the
+publish stage optimizes it and swaps it in, so the webapp never waits on an
+ingest. Without --build, publish compacts the live database the same way.
+
+Heavy modules (pandas, difflib, the pipeline scripts themselves) are only
+imported by the stage that needs them so lightweight commands start fast.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_DB = SCRIPT_DIR.parent / "webapp" / "movies.db"
+DEFAULT_PARQUET = SCRIPT_DIR / "train-00000-of-00001.parquet"
+DEFAULT_BASE_URL = "http://localhost:3000"
+DEFAULT_SNAPSHOT_DIR = SCRIPT_DIR / "snapshot"
+DEFAULT_EMBED_TIMEOUT = 3600
+
+STAGES = ["convert", "backfill", "analyze", "chunk", "context", "snapshot", "restore", "publish", "embed", "bench", "load"]
+
+class PipelineContext:
+    """State shared by the stages of one CLI run"""
+
+    def __init__(self, args):
+        self.args = args
+        self.db_path = Path(args.db)
+        self.live_path = Path(args.db)
+        self.staging = None
+        self._metrics = None
+        self._plot_data = None
+        self._indexes = None
+
+    @property
+    def metrics(self):
+        if self._metrics is None:
+            from instrumentation import PipelineMetrics
+            self._metrics = PipelineMetrics("pinestream_data")
+        return self._metrics
+
+    def csv_files(self):
+        return sorted(str(path) for path in Path(self.args.csv_dir).glob("*.csv"))
+
+    def plot_indexes(self):
+        """Load plot CSVs and build strategy indexes once per run"""
+        if self._indexes is None:
+            from ultimate_plot_extraction import load_csv_data
+            with self.metrics.stage("load_csv") as stage:
+                self._plot_data, self._indexes = load_csv_data(self.csv_files())
+                stage["rows"] = len(self._plot_data)
+        return self._plot_data, self._indexes
+
+    def plot_data(self):
+        """Plot CSV data, reusing plot_indexes()'s copy or loading it without indexes"""
+        if self._plot_data is None:
+            from debug_matching import load_csv_data
+            with self.metrics.stage("load_csv") as stage:
+                self._plot_data = load_csv_data(self.csv_files())
+                stage["rows"] = len(self._plot_data)
+        return self._plot_data
+
+def require_db(ctx):
+    if not ctx.db_path.exists():
+        print(f"Error: Database file {ctx.db_path} not found!")
+        sys.exit(1)
+
+def run_convert(ctx):
+    """Convert the parquet catalog into the movies table"""
+    import convert_data
+    count = convert_data.convert(ctx.args.parquet, ctx.db_path, ctx.metrics)
+    print(f"Successfully converted {count} movies to {ctx.db_path}")
+
+def run_backfill(ctx):
+    """Import exact-title plots, then backfill the rest with every strategy"""
+    require_db(ctx)
+    import update_movies_with_plots
+    import ultimate_plot_extraction
+
+    plot_data, indexes = ctx.plot_indexes()
+    import_cache = backfill_cache = None
+    if not ctx.args.no_match_cache:
+        from match_cache import BACKFILL_SCOPE, IMPORT_SCOPE, MatchCache
+        import_cache = MatchCache(plot_data, IMPORT_SCOPE)
+        backfill_cache = MatchCache(plot_data, BACKFILL_SCOPE)
+    with ctx.metrics.stage("add_plot_column"):
+        update_movies_with_plots.add_plot_column(ctx.db_path)
+    with ctx.metrics.stage("import_plots") as stage:
+        update_movies_with_plots.update_database(ctx.db_path, plot_data, ctx.metrics, cache=import_cache)
+        stage["rows"] = ctx.metrics.counters["movies_scanned"]
+    with ctx.metrics.stage("find_matches"):
+        matches = ultimate_plot_extraction.backfill_in_batches(ctx.db_path, indexes, ctx.metrics,
+                                                               cache=backfill_cache)
+    for cache in (import_cache, backfill_cache):
+        if cache:
+            cache.close(ctx.metrics)
+    print(f"Backfilled {len(matches)} additional movies")
+
+def run_analyze(ctx):
+    """Print title matching analysis"""
+    require_db(ctx)
+    import debug_matching
+    plot_data = ctx.plot_data()
+    with ctx.metrics.stage("analyze_matching"):
+        debug_matching.analyze_matching(ctx.db_path, plot_data)
+
+def run_chunk(ctx):
+    """Prepare plots for chunking by clustering near-duplicates"""
+    require_db(ctx)
+    import dedupe_plots
+    dedupe_plots.dedupe(ctx.db_path, ctx.metrics)
+
+def run_context(ctx):
+    """Precompute token-budgeted RAG context snippets"""
+    require_db(ctx)
+    import build_contexts
+    with ctx.metrics.stage("build_contexts") as stage:
+        build_contexts.build_contexts(ctx.db_path, ctx.metrics)
+        stage["rows"] = ctx.metrics.counters.get("contexts_built", 0)
+
+def run_snapshot(ctx):
+    """Export the enriched catalog as a zstd Parquet snapshot"""
+    require_db(ctx)
+    import snapshot
+    snapshot.export_snapshot(ctx.db_path, ctx.args.snapshot_dir, ctx.metrics,
+                             vectors=ctx.args.vectors, arrow=ctx.args.arrow)
+
+def run_restore(ctx):
+    """Build a fresh database from a snapshot instead of convert and backfill"""
+    import snapshot
+    snapshot.restore_snapshot(ctx.args.snapshot_dir, ctx.db_path, ctx.metrics)
+
+def run_publish(ctx):
+    """Optimize the staging build (or a copy of the live database) and swap it in"""
+    import build_database
+    if ctx.staging is None and build_database.staging_path(ctx.live_path).exists():
+        print(f"Error: {build_database.staging_path(ctx.live_path)} holds an unpublished build; "
+              "run publish with --build to swap it in, or delete it first")
+        sys.exit(1)
+    build_database.publish(ctx.live_path, ctx.metrics, staging=ctx.staging)
+    # Later stages such as embed work against the published file
+    ctx.db_path = ctx.live_path
+    ctx.staging = None
+
+def run_embed(ctx):
+    """Trigger dense and sparse embedding generation in a running webapp"""
+    import json
+    import urllib.request
+
+    for kind in ("dense", "sparse"):
+        url = f"{ctx.args.base_url}/api/admin/generate-{kind}-embeddings"
+        print(f"POST {url}")
+        request = urllib.request.Request(url, method="POST")
+        with ctx.metrics.stage(f"embed_{kind}"):
+            timeout = ctx.args.timeout or DEFAULT_EMBED_TIMEOUT
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                result = json.load(response)
+        print(f"  {result.get('message', result)}")
+
+def run_bench(ctx):
+    """Run the benchmark suite with any extra arguments"""
+    import benchmark
+    benchmark.main(ctx.args.extra_args)
+
+def run_load(ctx):
+    """Load test a running webapp with any extra arguments"""
+    import load_test
+    defaults = ["--base-url", ctx.args.base_url, "--db", str(ctx.db_path)]
+    if ctx.args.timeout is not None:
+        defaults += ["--timeout", str(ctx.args.timeout)]
+    load_test.main(defaults + ctx.args.extra_args)
+
+RUNNERS = {
+    "convert": run_convert,
+    "backfill": run_backfill,
+    "analyze": run_analyze,
+    "chunk": run_chunk,
+    "context": run_context,
+    "snapshot": run_snapshot,
+    "restore": run_restore,
+    "publish": run_publish,
+    "embed": run_embed,
+    "bench": run_bench,
+    "load": run_load,
+}
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="pinestream-data",
+        description="Run PineStream data pipeline stages",
+        epilog="Arguments not listed here are passed to the bench or load stage.",
+    )
+    parser.add_argument("stages", nargs="+", choices=STAGES, metavar="stage",
+                        help=f"one or more of: {', '.join(STAGES)}")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="SQLite database to update")
+    parser.add_argument("--parquet", default=str(DEFAULT_PARQUET), help="catalog for convert")
+    parser.add_argument("--csv-dir", default=str(SCRIPT_DIR), help="directory with plot CSVs")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="webapp URL for embed")
+    parser.add_argument("--timeout", type=float,
+                        help=f"request timeout in seconds for embed (default {DEFAULT_EMBED_TIMEOUT}) "
+                             "and load (default 30)")
+    parser.add_argument("--snapshot-dir", default=str(DEFAULT_SNAPSHOT_DIR),
+                        help="directory for snapshot and restore")
+    parser.add_argument("--vectors", action="store_true", help="snapshot dense vectors from Pinecone too (restore doesn't load them back)")
+    parser.add_argument("--arrow", action="store_true",
+                        help="snapshot memory-mappable Arrow IPC copies too")
+    parser.add_argument("--no-match-cache", action="store_true",
+                        help="decide every title match again instead of using data/match_cache.db")
+    parser.add_argument("--build", action="store_true",
+                        help="write to a staging database until the publish stage")
+    parser.add_argument("--no-metrics", action="store_true", help="don't write a metrics record")
+    args, extra = parser.parse_known_args(argv)
+    if extra and not {"bench", "load"} & set(args.stages):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if {"bench", "load"} <= set(args.stages):
+        parser.error("run bench and load separately so their arguments don't mix")
+    args.extra_args = extra
+    return args
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    ctx = PipelineContext(args)
+
+    # convert and restore rebuild the catalog, so a build with them starts from an empty file
+    fresh = args.build and bool({"convert", "restore"} & set(args.stages))
+    if args.build:
+        import build_database
+        ctx.staging = build_database.create_staging(ctx.live_path, fresh=fresh)
+        ctx.db_path = ctx.staging
+
+    try:
+        for stage in args.stages:
+            print(f"\n=== {stage.upper()} ===")
+            RUNNERS[stage](ctx)
+    except BaseException:
+        # convert or restore failed before its first checkpoint, so the file
+        # holds nothing to resume; otherwise the next --build run resumes it
+        if fresh and ctx.staging is not None and ctx.staging.exists():
+            if not build_database.resumable(ctx.staging):
+                ctx.staging.unlink()
+                print(f"\nRemoved failed build {ctx.staging}")
+            else:
+                print(f"\nStaging build left in {ctx.staging}; rerun the same --build command to resume it")
+        raise
+
+    if ctx.staging is not None:
+        print(f"\nStaging build left in {ctx.staging}; run the publish stage with --build to swap it in")
+
+    if ctx._metrics is not None and not args.no_metrics:
+        ctx.metrics.write()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+def create_plot_matches_table(conn):
+    """Create plot_matches table if it doesn't exist"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS plot_matches (
+        movie_id INTEGER PRIMARY KEY,
+        strategy TEXT NOT NULL,
+        FOREIGN KEY (movie_id) REFERENCES movies(id)
+    )
+    ''')
+    conn.commit()
+
+def record_plot_matches(conn, matches):
+    """Record the strategy that matched each plot from (movie_id, strategy) pairs"""
+    conn.executemany(
+        "INSERT OR REPLACE INTO plot_matches (movie_id, strategy) VALUES (?, ?)",
+        matches,
+    )
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""Export the enriched catalog as a columnar snapshot and rebuild databases from it.
+
+A snapshot is a directory of zstd-compressed Parquet files, one per table,
+plus manifest.json:
+
+    movies.parquet          catalog columns, plot and plot_strategy
+    chunks.parquet          chunk_mappings rows
+    plot_clusters.parquet   near-duplicate plot clusters, when built
+    movie_contexts.parquet  RAG context snippets, when built
+    vectors.parquet         dense chunk vectors, with --vectors (export only)
+
+Tables are streamed from SQLite in record batches, so memory stays flat as
+the catalog grows. Columns are typed from their declared SQLite types. A value SQLite stored
+despite its column type, such as text in movies.vote_count, is kept as text
+in a <column>__raw column so restoring gives back the same rows.
+
+Restoring bulk-inserts the columns into a fresh database, which replaces
+rerunning convert and every plot matching pass. Vectors are not restored:
+they live in Pinecone, so run the embed stage after publishing instead. With --arrow each table is
+also written as uncompressed Arrow IPC, which analysis tools can memory-map
+without copying or decompressing.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from checkpoints import checkpoint_table_exists, finish_stage, save_checkpoint, start_stage
+from instrumentation import PipelineMetrics
+
+# Bump when the snapshot layout changes; restore refuses other versions
+SNAPSHOT_VERSION = 1
+
+ZSTD_LEVEL = int(os.environ.get("PINESTREAM_ZSTD_LEVEL", "9"))
+
+# Rows fetched from SQLite per Arrow record batch when exporting
+EXPORT_BATCH_ROWS = 50_000
+
+# Rows per executemany call when restoring
+RESTORE_BATCH_ROWS = 50_000
+
+# Chunk ids per Pinecone fetch request
+FETCH_BATCH_SIZE = 100
+
+# Checkpoint row in pipeline_checkpoints, written once a restore is complete
+CHECKPOINT_STAGE = "restore"
+
+# Suffix of the text column keeping values that don't fit a column's declared type
+RAW_SUFFIX = "__raw"
+
+# SQLite storage classes (typeof) each Arrow type holds without a raw column
+STORAGE_CLASSES = {
+    pa.int64(): {"integer"},
+    pa.float64(): {"integer", "real"},
+    pa.string(): {"text"},
+    pa.binary(): {"blob"},
+}
+
+# Snapshot table -> query reading it from SQLite
+EXPORT_QUERIES = {
+    "movies": '''
+    SELECT m.*, pm.strategy AS plot_strategy
+    FROM movies m
+    LEFT JOIN plot_matches pm ON pm.movie_id = m.id
+    ORDER BY m.id
+    ''',
+    "chunks": "SELECT chunk_id, movie_id, chunk_index, total_chunks, source FROM chunk_mappings ORDER BY movie_id, chunk_id",
+    "plot_clusters": "SELECT * FROM plot_clusters ORDER BY movie_id",
+    "movie_contexts": "SELECT * FROM movie_contexts ORDER BY movie_id",
+}
+
+# Table each export reads; a snapshot table is skipped when it doesn't exist
+EXPORT_SOURCES = {
+    "movies": "movies",
+    "chunks": "chunk_mappings",
+    "plot_clusters": "plot_clusters",
+    "movie_contexts": "movie_contexts",
+}
+
+def table_exists(conn, name):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+def declared_types(conn, table):
+    """Declared SQLite type of each column of table"""
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def arrow_type(declared):
+    """Arrow type for a declared SQLite type, by SQLite's affinity rules; None to infer"""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(name in declared for name in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if not declared or "BLOB" in declared:
+        return None
+    return pa.float64()
+
+def fits(value, type_):
+    if value is None:
+        return True
+    if pa.types.is_integer(type_):
+        return isinstance(value, int)
+    if pa.types.is_floating(type_):
+        return isinstance(value, (int, float))
+    return isinstance(value, str)
+
+def storage_classes(conn, sql, names):
+    """SQLite storage classes found in each result column of a query, without fetching its rows"""
+    distinct = ", ".join(f'group_concat(DISTINCT typeof("{name}"))' for name in names)
+    row = conn.execute(f"SELECT {distinct} FROM ({sql})").fetchone()
+    return {name: set(found.split(",")) - {"null"} if found else set()
+            for name, found in zip(names, row)}
+
+def column_type(declared, classes):
+    """Arrow type of a result column and whether it needs a raw column.
+
+    A declared type maps by SQLite's affinity rules; without one the type
+    follows the storage classes the column holds.
+    """
+    type_ = arrow_type(declared)
+    if type_ is None:
+        if not classes:
+            return pa.null(), False
+        if classes <= {"integer"}:
+            type_ = pa.int64()
+        elif classes <= {"integer", "real"}:
+            type_ = pa.float64()
+        elif classes == {"blob"}:
+            type_ = pa.binary()
+        else:
+            type_ = pa.string()
+    return type_, not classes <= STORAGE_CLASSES[type_]
+
+def query_batches(conn, sql, types=None, batch_rows=EXPORT_BATCH_ROWS):
+    """Run a query and stream its result as Arrow record batches.
+
+    Returns (schema, batches). Columns get the Arrow type of their declared
+    SQLite type from types. SQLite doesn't enforce declared types, so a value
+    that doesn't fit (text in an INTEGER column, say) is left null there and
+    kept as text in a <column>__raw column, which insert_table puts back.
+    The schema is settled by one typeof() pass in SQLite, after which rows
+    are fetched batch_rows at a time.
+    """
+    types = types or {}
+    cursor = conn.execute(sql)
+    names = [column[0] for column in cursor.description]
+    classes = storage_classes(conn, sql, names)
+
+    columns = []
+    fields = []
+    for name in names:
+        type_, raw = column_type(types.get(name), classes[name])
+        columns.append((type_, raw))
+        fields.append(pa.field(name, type_))
+        if raw:
+            extra = ", ".join(sorted(classes[name] - STORAGE_CLASSES[type_]))
+            print(f"  {name}: {extra} values are not {type_}; kept in {name}{RAW_SUFFIX}")
+            fields.append(pa.field(name + RAW_SUFFIX, pa.string()))
+    schema = pa.schema(fields)
+
+    def batches():
+        while rows := cursor.fetchmany(batch_rows):
+            arrays = []
+            for (type_, raw), values in zip(columns, zip(*rows)):
+                if not raw:
+                    arrays.append(pa.array(values, type_))
+                    continue
+                misfits = [not fits(value, type_) for value in values]
+                arrays.append(pa.array([None if bad else value for value, bad in zip(values, misfits)], type_))
+                arrays.append(pa.array([str(value) if bad else None for value, bad in zip(values, misfits)],
+                                       pa.string()))
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    return schema, batches()
+
+def write_table(schema, batches, snapshot_dir, name, arrow=False):
+    """Stream record batches into one snapshot table; return (rows, Parquet size in bytes)"""
+    path = snapshot_dir / f"{name}.parquet"
+    arrow_path = snapshot_dir / f"{name}.arrow"
+    rows = 0
+    with contextlib.ExitStack() as stack:
+        writers = [stack.enter_context(
+            pq.ParquetWriter(path, schema, compression="zstd", compression_level=ZSTD_LEVEL)
+        )]
+        if arrow:
+            writers.append(stack.enter_context(ipc.new_file(arrow_path, schema)))
+        for batch in batches:
+            for writer in writers:
+                writer.write_batch(batch)
+            rows += batch.num_rows
+    if not arrow and arrow_path.exists():
+        # A copy left by an earlier export would no longer match the Parquet file
+        arrow_path.unlink()
+    return rows, path.stat().st_size
+
+def fetch_dense_vectors(chunk_ids):
+    """Fetch dense vectors for chunk ids from Pinecone over its REST API.
+
+    Honours PINECONE_CONTROLLER_HOST, so the stand-in from
+    standin_services.py works as well. Returns (schema, batches) with one
+    record batch of (chunk_id, values) per fetch request.
+    """
+    import urllib.parse
+    import urllib.request
+
+    api_key = os.environ.get("PINECONE_API_KEY")
+    if not api_key:
+        raise RuntimeError("PINECONE_API_KEY environment variable is required for --vectors")
+    controller = os.environ.get("PINECONE_CONTROLLER_HOST", "https://api.pinecone.io")
+    headers = {"Api-Key": api_key, "X-Pinecone-API-Version": "2025-04"}
+
+    def get(url):
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60) as response:
+            return json.load(response)
+
+    index = get(f"{controller}/indexes/movies-dense")
+    host = index["host"]
+    if not host.startswith("http"):
+        host = f"https://{host}"
+    schema = pa.schema([
+        pa.field("chunk_id", pa.string()),
+        pa.field("values", pa.list_(pa.float32(), index["dimension"])),
+    ])
+
+    def batches():
+        for start in range(0, len(chunk_ids), FETCH_BATCH_SIZE):
+            batch = chunk_ids[start:start + FETCH_BATCH_SIZE]
+            query = urllib.parse.urlencode([("ids", chunk_id) for chunk_id in batch])
+            vectors = get(f"{host}/vectors/fetch?{query}").get("vectors", {})
+            found = [chunk_id for chunk_id in batch if chunk_id in vectors]
+            flat = pa.array([v for chunk_id in found for v in vectors[chunk_id]["values"]], pa.float32())
+            yield pa.RecordBatch.from_arrays([
+                pa.array(found, pa.string()),
+                pa.FixedSizeListArray.from_arrays(flat, index["dimension"]),
+            ], schema=schema)
+
+    return schema, batches()
+
+def export_snapshot(db_path, snapshot_dir, metrics, vectors=False, arrow=False):
+    """Write every available table of db_path to snapshot_dir"""
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": str(db_path),
+        "compression": f"zstd-{ZSTD_LEVEL}",
+        "tables": {},
+    }
+    has_plot_matches = table_exists(conn, "plot_matches")
+    for name, sql in EXPORT_QUERIES.items():
+        if not table_exists(conn, EXPORT_SOURCES[name]):
+            continue
+        if name == "movies" and not has_plot_matches:
+            sql = "SELECT m.*, NULL AS plot_strategy FROM movies m ORDER BY m.id"
+        with metrics.stage(f"export_{name}") as stage:
+            schema, batches = query_batches(conn, sql, declared_types(conn, EXPORT_SOURCES[name]))
+            rows, size = write_table(schema, batches, snapshot_dir, name, arrow)
+            stage["rows"] = rows
+        manifest["tables"][name] = {"rows": rows, "bytes": size}
+        print(f"  {name}: {rows} rows, {size / 1024:.1f} KiB")
+
+    if vectors and "chunks" in manifest["tables"]:
+        chunk_ids = [row[0] for row in conn.execute("SELECT DISTINCT chunk_id FROM chunk_mappings")]
+        with metrics.stage("export_vectors") as stage:
+            schema, batches = fetch_dense_vectors(chunk_ids)
+            rows, size = write_table(schema, batches, snapshot_dir, "vectors", arrow)
+            stage["rows"] = rows
+        manifest["tables"]["vectors"] = {"rows": rows, "bytes": size}
+        print(f"  vectors: {rows} rows, {size / 1024:.1f} KiB")
+    conn.close()
+
+    with open(snapshot_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Snapshot written to {snapshot_dir}")
+    return manifest
+
+def read_manifest(snapshot_dir):
+    with open(Path(snapshot_dir) / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {manifest.get('version')} is not supported "
+                         f"(expected {SNAPSHOT_VERSION})")
+    return manifest
+
+def open_table(snapshot_dir, name):
+    """Open a snapshot table for analysis without SQLite.
+
+    The Arrow IPC copy is memory-mapped zero-copy when it exists; otherwise
+    the Parquet file is memory-mapped and decoded.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    arrow_path = snapshot_dir / f"{name}.arrow"
+    if arrow_path.exists():
+        return ipc.open_file(pa.memory_map(str(arrow_path), "r")).read_all()
+    return pq.read_table(snapshot_dir / f"{name}.parquet", memory_map=True)
+
+def insert_table(conn, table, target, columns=None):
+    """Bulk insert Arrow columns into a SQLite table; return the row count.
+
+    Values kept in a <column>__raw column replace the column's nulls; the
+    target column's affinity turns numeric text back into numbers.
+    """
+    columns = columns or [name for name in table.column_names if not name.endswith(RAW_SUFFIX)]
+    raw = [name + RAW_SUFFIX for name in columns if name + RAW_SUFFIX in table.column_names]
+    table = table.select(columns + raw)
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({placeholders})"
+    for batch in table.to_batches(max_chunksize=RESTORE_BATCH_ROWS):
+        values = []
+        for name in columns:
+            column = batch.column(name).to_pylist()
+            if name + RAW_SUFFIX in raw:
+                kept = batch.column(name + RAW_SUFFIX).to_pylist()
+                column = [value if text is None else text for value, text in zip(column, kept)]
+            values.append(column)
+        conn.executemany(sql, zip(*values))
+    return table.num_rows
+
+def create_restore_tables(conn, movie_columns):
+    """Create the pipeline tables a snapshot restores into"""
+    import build_contexts
+    import dedupe_plots
+    import plot_matches
+
+    # Same column types as convert_data.create_movies_table plus the plot column
+    types = {"id": "INTEGER PRIMARY KEY AUTOINCREMENT", "title": "TEXT NOT NULL",
+             "popularity": "REAL", "vote_count": "INTEGER", "vote_average": "REAL"}
+    definitions = ", ".join(f"{name} {types.get(name, 'TEXT')}" for name in movie_columns)
+    conn.execute(f"CREATE TABLE movies ({definitions})")
+    plot_matches.create_plot_matches_table(conn)
+    dedupe_plots.create_plot_clusters_table(conn)
+    build_contexts.create_contexts_table(conn)
+    # Same schema as AdminService.createChunkMappingsTable
+    conn.execute('''
+    CREATE TABLE chunk_mappings (
+        chunk_id TEXT NOT NULL,
+        movie_id INTEGER NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        total_chunks INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        PRIMARY KEY (movie_id, chunk_id),
+        FOREIGN KEY (movie_id) REFERENCES movies(id)
+    ) WITHOUT ROWID
+    ''')
+
+def restored(db_path):
+    """Whether db_path holds a completed restore"""
+    conn = sqlite3.connect(db_path)
+    try:
+        if not checkpoint_table_exists(conn):
+            return False
+        row = conn.execute(
+            "SELECT status FROM pipeline_checkpoints WHERE stage = ?", (CHECKPOINT_STAGE,)
+        ).fetchone()
+        return row is not None and row[0] == "completed"
+    finally:
+        conn.close()
+
+def restore_snapshot(snapshot_dir, db_path, metrics):
+    """Build a fresh database at db_path from a snapshot.
+
+    vectors.parquet is skipped: vectors belong in Pinecone, so run the embed
+    stage after publishing instead.
+
+    The restore checkpoint is only written once every table is in, so a
+    resumed --build skips a finished restore and a failed one leaves none.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    db_path = Path(db_path)
+    manifest = read_manifest(snapshot_dir)
+    if db_path.exists() and restored(db_path):
+        print(f"{db_path} was already restored from a snapshot")
+        return {}
+    if db_path.exists() and db_path.stat().st_size > 0:
+        raise FileExistsError(f"{db_path} already exists; restore only builds fresh databases")
+
+    with metrics.stage("read_snapshot") as stage:
+        tables = {name: pq.read_table(snapshot_dir / f"{name}.parquet", memory_map=True)
+                  for name in manifest["tables"] if name != "vectors"}
+        stage["rows"] = sum(table.num_rows for table in tables.values())
+
+    conn = sqlite3.connect(db_path)
+    # Nothing reads the file until it is complete, so skip journaling
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    movies = tables["movies"]
+    movie_columns = [name for name in movies.column_names
+                     if name != "plot_strategy" and not name.endswith(RAW_SUFFIX)]
+    create_restore_tables(conn, movie_columns)
+
+    counts = {}
+    with metrics.stage("insert_movies", rows=movies.num_rows):
+        counts["movies"] = insert_table(conn, movies, "movies", movie_columns)
+        matched = movies.filter(pc.is_valid(movies["plot_strategy"])).select(["id", "plot_strategy"])
+        counts["plot_matches"] = insert_table(
+            conn, matched.rename_columns(["movie_id", "strategy"]), "plot_matches"
+        )
+    for name, target in (("chunks", "chunk_mappings"), ("plot_clusters", "plot_clusters"),
+                         ("movie_contexts", "movie_contexts")):
+        if name in tables:
+            with metrics.stage(f"insert_{name}", rows=tables[name].num_rows):
+                counts[target] = insert_table(conn, tables[name], target)
+    conn.commit()
+
+    start_stage(conn, CHECKPOINT_STAGE, movies.num_rows)
+    last_id = pc.max(movies["id"]).as_py() or 0
+    save_checkpoint(conn, CHECKPOINT_STAGE, last_id, movies.num_rows, movies.num_rows)
+    finish_stage(conn, CHECKPOINT_STAGE, f"Completed! Restored {counts['movies']} movies.")
+    conn.close()
+
+    for name, rows in counts.items():
+        print(f"  {name}: {rows} rows")
+    print(f"Restored {db_path} from snapshot created {manifest['created_at']}")
+    return counts
+
+def main(argv=None):
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Export or restore a columnar catalog snapshot")
+    parser.add_argument("command", choices=["export", "restore"])
+    parser.add_argument("--db", default=str(script_dir.parent / "webapp" / "movies.db"))
+    parser.add_argument("--snapshot-dir", default=str(script_dir / "snapshot"))
+    parser.add_argument("--vectors", action="store_true", help="also export dense vectors from Pinecone (restore doesn't load them back)")
+    parser.add_argument("--arrow", action="store_true", help="also write memory-mappable Arrow IPC files")
+    args = parser.parse_args(argv)
+
+    metrics = PipelineMetrics("snapshot")
+    if args.command == "export":
+        if not Path(args.db).exists():
+            print(f"Error: Database file {args.db} not found!")
+            return
+        export_snapshot(args.db, args.snapshot_dir, metrics, args.vectors, args.arrow)
+    else:
+        restore_snapshot(args.snapshot_dir, args.db, metrics)
+    metrics.write()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""Local stand-ins for the Pinecone and Groq APIs used by the webapp.
+
+They answer the requests the webapp's SDK clients make with plausible data
+derived from movies.db and a configurable delay, so load tests measure the
+webapp itself without network calls, API keys or usage costs. Start the
+webapp with the environment printed on startup.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_VECTOR_PORT = 5081
+DEFAULT_LLM_PORT = 5082
+
+# Index names and models, mirroring PINECONE_INDEXES in webapp/server/utils/pinecone.ts
+INDEXES = {
+    "movies-dense": {"model": "multilingual-e5-large", "dimension": 1024, "vector_type": "dense"},
+    "movies-sparse": {"model": "pinecone-sparse-english-v0", "dimension": None, "vector_type": "sparse"},
+}
+
+# Genres the insight prompt allows, used to fake filter extraction
+GENRES = ["action", "comedy", "drama", "horror", "sci-fi", "romance", "thriller",
+          "documentary", "animation", "fantasy", "adventure", "crime", "mystery",
+          "western", "musical", "war", "family", "history", "biography", "sport"]
+
+# Characters of plot text kept per seeded record
+RECORD_TEXT_CHARS = 600
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def genre_list(genre):
+    """Lowercase genre array, as csvToArray stores it in Pinecone metadata"""
+    if not genre:
+        return []
+    return [g.strip().lower() for g in genre.split(",") if g.strip()]
+
+def date_number(release_date):
+    """Milliseconds since the epoch, as dateToNumber stores it in Pinecone metadata"""
+    if not release_date:
+        return None
+    try:
+        return int(time.mktime(time.strptime(release_date[:10], "%Y-%m-%d")) * 1000)
+    except ValueError:
+        return None
+
+def matches_condition(value, condition):
+    """Evaluate one Pinecone metadata filter condition against a field value"""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    values = value if isinstance(value, list) else [value]
+    for op, expected in condition.items():
+        if op == "$eq" and expected not in values:
+            return False
+        if op == "$ne" and expected in values:
+            return False
+        if op == "$in" and not set(values) & set(expected):
+            return False
+        if op == "$nin" and set(values) & set(expected):
+            return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            if op == "$gt" and not value > expected:
+                return False
+            if op == "$gte" and not value >= expected:
+                return False
+            if op == "$lt" and not value < expected:
+                return False
+            if op == "$lte" and not value <= expected:
+                return False
+    return True
+
+def matches_filter(fields, metadata_filter):
+    if not metadata_filter:
+        return True
+    return all(matches_condition(fields.get(key), condition) for key, condition in metadata_filter.items())
+
+class RecordStore:
+    """In-memory records with a word index standing in for both vector indexes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = {}
+        self.postings = {}
+
+    def add(self, record_id, fields):
+        with self.lock:
+            self.records[record_id] = fields
+            for word in set(tokenize(fields.get("text", ""))):
+                self.postings.setdefault(word, set()).add(record_id)
+
+    def load_database(self, db_path):
+        """Seed one record per chunk mapping, or per movie when there are none"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        movies = {
+            row[0]: row[1:]
+            for row in conn.execute("SELECT id, title, overview, plot, genre, release_date FROM movies")
+        }
+        has_mappings = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunk_mappings'"
+        ).fetchone()
+        mappings = []
+        if has_mappings:
+            mappings = conn.execute("SELECT chunk_id, movie_id, source FROM chunk_mappings").fetchall()
+        conn.close()
+
+        if not mappings:
+            mappings = [(f"{movie_id}-movie", movie_id, "overview") for movie_id in movies]
+        for chunk_id, movie_id, source in mappings:
+            if movie_id not in movies:
+                continue
+            title, overview, plot, genre, release_date = movies[movie_id]
+            text = f"{title}. {overview or ''} {(plot or '')[:RECORD_TEXT_CHARS]}"
+            fields = {"text": text, "title": title, "movie_id": movie_id,
+                      "genre": genre_list(genre), "source": source}
+            released = date_number(release_date)
+            if released is not None:
+                fields["release_date"] = released
+            self.add(chunk_id, fields)
+        return len(mappings)
+
+    def search_text(self, text, top_k, metadata_filter):
+        """Score records by summed idf of the query words they contain"""
+        scores = {}
+        with self.lock:
+            total = max(len(self.records), 1)
+            for word in set(tokenize(text)):
+                posting = self.postings.get(word)
+                if not posting:
+                    continue
+                idf = math.log(1 + total / len(posting))
+                for record_id in posting:
+                    scores[record_id] = scores.get(record_id, 0.0) + idf
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        hits = []
+        for record_id, score in ranked:
+            fields = self.records[record_id]
+            if matches_filter(fields, metadata_filter):
+                hits.append((record_id, score, fields))
+                if len(hits) == top_k:
+                    break
+        return hits
+
+    def search_vector(self, vector, top_k, metadata_filter):
+        """Return a deterministic pseudo-random neighbourhood for a query vector"""
+        seed = zlib.crc32(json.dumps([round(v, 4) for v in vector[:16]]).encode("utf-8"))
+        rng = random.Random(seed)
+        with self.lock:
+            ids = list(self.records)
+        rng.shuffle(ids)
+        hits = []
+        for record_id in ids:
+            fields = self.records[record_id]
+            if matches_filter(fields, metadata_filter):
+                hits.append((record_id, 0.9 - 0.005 * len(hits), fields))
+                if len(hits) == top_k:
+                    break
+        return hits
+
+def fake_vector(record_id, dimension):
+    """Stable unit-scale vector for a record id"""
+    rng = random.Random(zlib.crc32(record_id.encode("utf-8")))
+    return [round(rng.uniform(-1, 1), 6) for _ in range(dimension)]
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Shared request plumbing: JSON bodies, delays and quiet logging"""
+
+    protocol_version = "HTTP/1.1"
+    latency_ms = 0.0
+    ms_per_1k_tokens = 0.0
+    jitter = 0.2
+
+    def log_message(self, format, *args):
+        pass
+
+    def delay(self, extra_ms=0.0):
+        base = self.latency_ms + extra_ms
+        if base > 0:
+            time.sleep(base * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def read_json(self):
+        body = self.read_body()
+        return json.loads(body) if body else {}
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def not_found(self):
+        self.send_json({"error": {"code": "NOT_FOUND", "message": self.path}}, 404)
+
+class PineconeHandler(StandinHandler):
+    """Control plane, data plane and inference endpoints on one port"""
+
+    store = None
+    host = None
+
+    def index_model(self, name):
+        spec = INDEXES[name]
+        model = {
+            "name": name,
+            "metric": "cosine" if spec["vector_type"] == "dense" else "dotproduct",
+            "host": self.host,
+            "deletion_protection": "disabled",
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+            "status": {"ready": True, "state": "Ready"},
+            "vector_type": spec["vector_type"],
+            "embed": {"model": spec["model"], "field_map": {"text": "text"}},
+        }
+        if spec["dimension"]:
+            model["dimension"] = spec["dimension"]
+        return model
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/indexes":
+            self.send_json({"indexes": [self.index_model(name) for name in INDEXES]})
+        elif url.path.startswith("/indexes/") and url.path[len("/indexes/"):] in INDEXES:
+            self.send_json(self.index_model(url.path[len("/indexes/"):]))
+        elif url.path == "/vectors/fetch":
+            self.delay()
+            ids = parse_qs(url.query).get("ids", [])
+            dimension = INDEXES["movies-dense"]["dimension"]
+            vectors = {record_id: {"id": record_id, "values": fake_vector(record_id, dimension)}
+                       for record_id in ids if record_id in self.store.records}
+            self.send_json({"vectors": vectors, "namespace": "", "usage": {"readUnits": 1}})
+        else:
+            self.not_found()
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path.endswith("/upsert") and path.startswith("/records/namespaces/"):
+            self.upsert_records()
+        elif path.endswith("/search") and path.startswith("/records/namespaces/"):
+            self.search_records()
+        elif path == "/query":
+            self.query()
+        elif path == "/rerank":
+            self.rerank()
+        else:
+            self.not_found()
+
+    def upsert_records(self):
+        self.delay()
+        for line in self.read_body().decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record_id = record.pop("_id", None) or record.pop("id")
+            if isinstance(record.get("genre"), str):
+                record["genre"] = genre_list(record["genre"])
+            self.store.add(record_id, record)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def search_records(self):
+        self.delay()
+        query = self.read_json().get("query", {})
+        top_k = query.get("top_k") or query.get("topK") or 10
+        text = (query.get("inputs") or {}).get("text", "")
+        hits = self.store.search_text(text, top_k, query.get("filter"))
+        self.send_json({
+            "result": {"hits": [{"_id": record_id, "_score": score, "fields": fields}
+                                for record_id, score, fields in hits]},
+            "usage": {"read_units": 1},
+        })
+
+    def query(self):
+        self.delay()
+        body = self.read_json()
+        top_k = body.get("topK") or body.get("top_k") or 10
+        hits = self.store.search_vector(body.get("vector") or [], top_k, body.get("filter"))
+        include_metadata = body.get("includeMetadata", body.get("include_metadata"))
+        matches = []
+        for record_id, score, fields in hits:
+            match = {"id": record_id, "score": score}
+            if include_metadata:
+                match["metadata"] = {k: v for k, v in fields.items() if k != "text"}
+            matches.append(match)
+        self.send_json({"matches": matches, "namespace": "", "usage": {"readUnits": 1}})
+
+    def rerank(self):
+        body = self.read_json()
+        documents = body.get("documents") or []
+        # Reranking cost grows with the text sent, as with the hosted model
+        characters = sum(len(json.dumps(document)) for document in documents)
+        self.delay(characters / 4 / 1000 * self.ms_per_1k_tokens)
+
+        query_words = set(tokenize(body.get("query", "")))
+        fields = body.get("rank_fields") or body.get("rankFields") or ["text"]
+        scored = []
+        for index, document in enumerate(documents):
+            text = document.get(fields[0], "") if isinstance(document, dict) else str(document)
+            words = tokenize(text)
+            overlap = sum(1 for word in words if word in query_words)
+            scored.append((overlap / (len(words) + 1), index, document))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        top_n = body.get("top_n") or body.get("topN") or len(scored)
+        data = []
+        for score, index, document in scored[:top_n]:
+            item = {"index": index, "score": score}
+            if body.get("return_documents", body.get("returnDocuments", True)):
+                item["document"] = document
+            data.append(item)
+        self.send_json({"model": body.get("model"), "data": data, "usage": {"rerank_units": 1}})
+
+class GroqHandler(StandinHandler):
+    """OpenAI-compatible chat completions under Groq's /openai/v1 prefix"""
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/openai/v1/models":
+            self.send_json({"object": "list", "data": [
+                {"id": "llama-3.1-8b-instant", "object": "model", "created": 0, "owned_by": "standin"},
+            ]})
+        else:
+            self.not_found()
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/openai/v1/chat/completions":
+            self.not_found()
+            return
+        body = self.read_json()
+        messages = body.get("messages") or []
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        if "Return ONLY JSON" in system:
+            content = json.dumps(self.insight(user))
+        else:
+            count = max(1, user.count("Title:"))
+            content = "\n".join(
+                "Both films share a similar tone, central conflict and character dynamics."
+                for _ in range(count)
+            )
+        completion_tokens = len(content) // 4
+        # Prefill cost scales with the prompt, which is what RAG context size changes
+        self.delay(prompt_tokens / 1000 * self.ms_per_1k_tokens)
+
+        self.send_json({
+            "id": f"chatcmpl-standin-{random.getrandbits(32):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    @staticmethod
+    def insight(query):
+        """Fake the query analysis: genre keywords and an explicit decade"""
+        words = set(tokenize(query))
+        genres = [genre for genre in GENRES if genre in words] or None
+        decade = re.search(r"\b(19|20)?(\d)0s\b", query)
+        date_range = {"start": None, "end": None}
+        if decade:
+            # "90s" means the 1990s, "10s" the 2010s
+            century = decade.group(1) or ("20" if decade.group(2) in "012" else "19")
+            start = int(f"{century}{decade.group(2)}0")
+            date_range = {"start": f"{start}-01-01", "end": f"{start + 9}-12-31"}
+        has_filters = bool(genres or decade)
+        return {
+            "genres": genres,
+            "dateRange": date_range if decade else None,
+            "denseQuery": query,
+            "sparseQuery": " ".join(sorted(words)),
+            "userMessage": "Based on your request, we filtered movies." if has_filters else None,
+            "hasFilters": has_filters,
+        }
+
+def start_server(handler, port, **attributes):
+    """Start a handler class with class attributes set, in a daemon thread"""
+    handler = type(handler.__name__, (handler,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def start_standins(db_path, vector_port=DEFAULT_VECTOR_PORT, llm_port=DEFAULT_LLM_PORT,
+                   vector_latency_ms=40.0, llm_latency_ms=250.0, ms_per_1k_tokens=60.0):
+    """Start both stand-ins and return (servers, environment for the webapp)"""
+    store = RecordStore()
+    records = store.load_database(db_path)
+    print(f"Stand-in vector store seeded with {records} records from {db_path}")
+
+    vector_url = f"http://127.0.0.1:{vector_port}"
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    servers = [
+        start_server(PineconeHandler, vector_port, store=store, host=vector_url,
+                     latency_ms=vector_latency_ms, ms_per_1k_tokens=ms_per_1k_tokens),
+        start_server(GroqHandler, llm_port, latency_ms=llm_latency_ms,
+                     ms_per_1k_tokens=ms_per_1k_tokens),
+    ]
+    environment = {
+        "PINECONE_API_KEY": "standin",
+        "PINECONE_CONTROLLER_HOST": vector_url,
+        "GROQ_API_KEY": "standin",
+        "GROQ_BASE_URL": llm_url,
+    }
+    return servers, environment
+
+def main(argv=None):
+    default_db = Path(__file__).parent.parent / "webapp" / "movies.db"
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for Pinecone and Groq")
+    parser.add_argument("--db", default=str(default_db), help="database to seed records from")
+    parser.add_argument("--vector-port", type=int, default=DEFAULT_VECTOR_PORT)
+    parser.add_argument("--llm-port", type=int, default=DEFAULT_LLM_PORT)
+    parser.add_argument("--vector-latency-ms", type=float, default=40.0,
+                        help="simulated latency of each vector request")
+    parser.add_argument("--llm-latency-ms", type=float, default=250.0,
+                        help="simulated base latency of each chat completion")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=60.0,
+                        help="extra LLM and rerank latency per 1000 prompt tokens")
+    args = parser.parse_args(argv)
+
+    if not Path(args.db).exists():
+        print(f"Error: Database file {args.db} not found!")
+        return
+
+    servers, environment = start_standins(
+        args.db, args.vector_port, args.llm_port,
+        args.vector_latency_ms, args.llm_latency_ms, args.ms_per_1k_tokens,
+    )
+    print("\nStart the webapp with:")
+    for key, value in environment.items():
+        print(f"  export {key}={value}")
+    print("\nPress Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
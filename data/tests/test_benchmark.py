@@ -0,0 +1,27 @@
+import benchmark
+
+def test_run_compared_against_itself_has_no_regressions(tmp_path):
+    results = {"sizes": {"200": benchmark.bench_size(200, tmp_path, seed=1, fuzzy_sample=5, repeat=2)}}
+
+    assert benchmark.compare(results, results, benchmark.DEFAULT_TOLERANCE) == []
+
+def test_millisecond_noise_is_not_a_regression():
+    baseline = {"sizes": {"200": {"convert": {"seconds": 0.006}}}}
+    results = {"sizes": {"200": {"convert": {"seconds": 0.008}}}}
+
+    assert benchmark.compare(results, baseline, benchmark.DEFAULT_TOLERANCE) == []
+
+def test_slowdown_past_both_thresholds_is_a_regression():
+    baseline = {"sizes": {"200": {"convert": {"seconds": 0.100}}}}
+    results = {"sizes": {"200": {"convert": {"seconds": 0.200}}}}
+
+    regressions = benchmark.compare(results, baseline, benchmark.DEFAULT_TOLERANCE)
+    assert [(size, stage) for size, stage, _ in regressions] == [("200", "convert")]
+
+def test_stages_report_the_median_run():
+    runs = [{"convert": {"seconds": seconds, "rows": 100}} for seconds in (0.5, 0.1, 0.2)]
+
+    merged = benchmark.median_stats(runs)
+    assert merged["convert"]["seconds"] == 0.2
+    assert merged["convert"]["samples"] == [0.5, 0.1, 0.2]
+    assert merged["convert"]["rows_per_sec"] == 500.0
@@ -0,0 +1,23 @@
+import build_contexts
+
+def test_abbreviations_do_not_split_sentences():
+    plot = ("Peter is hurt. He goes to a F.E.A.S.T. building, where May comforts him. "
+            "They drive to St. Louis at night. Dr. Strange helps.")
+
+    assert build_contexts.split_sentences(plot) == [
+        "Peter is hurt.",
+        "He goes to a F.E.A.S.T. building, where May comforts him.",
+        "They drive to St. Louis at night.",
+        "Dr. Strange helps.",
+    ]
+
+def test_context_picks_whole_sentences():
+    plot = ("Peter's identity is revealed to the world after the battle in London. "
+            "He goes to a F.E.A.S.T. building, where May comforts him before Peter retrieves him. "
+            "May dies in his arms after the Goblin attacks the building.")
+
+    context, _, sentences = build_contexts.build_context("Spider-Man", None, plot, None, None)
+    plot_line = context.split("Plot: ", 1)[1]
+
+    assert sentences == 3
+    assert plot_line == plot
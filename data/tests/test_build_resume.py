@@ -0,0 +1,84 @@
+import sqlite3
+import pandas as pd
+import pytest
+import build_database
+import checkpoints
+import convert_data
+import pinestream_data
+from instrumentation import PipelineMetrics
+
+def write_catalog(path, count):
+    pd.DataFrame({
+        "Title": [f"Movie {i}" for i in range(1, count + 1)],
+        "Overview": ["An overview."] * count,
+        "Release_Date": ["2020-01-01"] * count,
+        "Popularity": [1.0] * count,
+        "Vote_Count": [10] * count,
+        "Vote_Average": [7.0] * count,
+        "Original_Language": ["en"] * count,
+        "Genre": ["Drama"] * count,
+        "Poster_Url": [None] * count,
+    }).to_parquet(path)
+
+def convert_build(tmp_path):
+    return ["--build", "--no-metrics", "--db", str(tmp_path / "movies.db"),
+            "--parquet", str(tmp_path / "catalog.parquet"), "convert"]
+
+def interrupt_on_batch(monkeypatch, number):
+    """Insert two movies per batch and raise KeyboardInterrupt on the given batch"""
+    insert = convert_data.insert_movies
+    calls = []
+
+    def flaky_insert(cursor, rows):
+        calls.append(rows)
+        if len(calls) == number:
+            raise KeyboardInterrupt
+        insert(cursor, rows)
+
+    monkeypatch.setattr(convert_data, "batched", lambda rows: checkpoints.batched(rows, 2))
+    monkeypatch.setattr(convert_data, "insert_movies", flaky_insert)
+
+@pytest.fixture
+def catalog(tmp_path):
+    write_catalog(tmp_path / "catalog.parquet", 5)
+    return tmp_path
+
+def test_interrupted_build_resumes_from_checkpoint(catalog, monkeypatch):
+    interrupt_on_batch(monkeypatch, 2)
+    with pytest.raises(KeyboardInterrupt):
+        pinestream_data.main(convert_build(catalog))
+
+    staging = build_database.staging_path(catalog / "movies.db")
+    assert staging.exists()
+    conn = sqlite3.connect(staging)
+    assert conn.execute(
+        "SELECT status, last_processed_id FROM pipeline_checkpoints WHERE stage = 'convert'"
+    ).fetchone() == ("interrupted", 2)
+    conn.close()
+
+    monkeypatch.undo()
+    pinestream_data.main(convert_build(catalog))
+
+    conn = sqlite3.connect(staging)
+    assert [row[0] for row in conn.execute("SELECT id FROM movies ORDER BY id")] == [1, 2, 3, 4, 5]
+    assert conn.execute(
+        "SELECT status, processed FROM pipeline_checkpoints WHERE stage = 'convert'"
+    ).fetchone() == ("completed", 5)
+    conn.close()
+
+def test_build_failing_before_first_checkpoint_is_removed(catalog, monkeypatch):
+    interrupt_on_batch(monkeypatch, 1)
+    with pytest.raises(KeyboardInterrupt):
+        pinestream_data.main(convert_build(catalog))
+
+    assert not build_database.staging_path(catalog / "movies.db").exists()
+
+def test_unfinished_build_is_not_published(catalog, monkeypatch):
+    interrupt_on_batch(monkeypatch, 2)
+    with pytest.raises(KeyboardInterrupt):
+        pinestream_data.main(convert_build(catalog))
+
+    staging = build_database.staging_path(catalog / "movies.db")
+    with pytest.raises(RuntimeError, match="unfinished stages"):
+        build_database.publish(catalog / "movies.db", PipelineMetrics("test"), staging=staging)
+    assert not (catalog / "movies.db").exists()
@@ -0,0 +1,15 @@
+import load_test
+
+def test_blank_titles_are_skipped():
+    movies = [
+        (1, "", "Drama", "A plot about a lighthouse keeper and his dog.", None),
+        (2, "   ", "Comedy", None, "An overview about two chefs in Paris."),
+        (3, "Storm Island", "Thriller", "A storm traps strangers on an island.", None),
+    ]
+
+    requests = load_test.build_requests(movies, {"search": 1, "similar": 1}, 50, seed=7)
+
+    assert len(requests) == 50
+    searches = [path for workload, _, path, _ in requests if workload == "search"]
+    assert searches and all("q=Storm" in path for path in searches)
+    assert all(path == "/api/movies/3/similar" for workload, _, path, _ in requests if workload == "similar")
@@ -0,0 +1,47 @@
+import sqlite3
+import convert_data
+import snapshot
+from instrumentation import PipelineMetrics
+
+def write_catalog(path):
+    conn = sqlite3.connect(path)
+    convert_data.create_movies_table(conn.cursor())
+    conn.executemany(
+        "INSERT INTO movies (title, vote_count, vote_average) VALUES (?, ?, ?)",
+        [("One", 10, 7.5), ("Two", "n/a", 6.0), ("Three", 30, None), ("Four", 40, 8)],
+    )
+    conn.commit()
+    conn.close()
+
+def stored_rows(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute('''
+    SELECT id, title, vote_count, typeof(vote_count), vote_average, typeof(vote_average)
+    FROM movies ORDER BY id
+    ''').fetchall()
+    conn.close()
+    return rows
+
+def test_query_streams_fixed_size_batches(tmp_path):
+    write_catalog(tmp_path / "movies.db")
+    conn = sqlite3.connect(tmp_path / "movies.db")
+
+    schema, batches = snapshot.query_batches(
+        conn, "SELECT * FROM movies ORDER BY id", snapshot.declared_types(conn, "movies"), batch_rows=3
+    )
+    sizes = [batch.num_rows for batch in batches]
+    conn.close()
+
+    assert sizes == [3, 1]
+    assert "vote_count__raw" in schema.names
+    assert "vote_average__raw" not in schema.names
+
+def test_snapshot_round_trip_keeps_misfit_values(tmp_path):
+    write_catalog(tmp_path / "movies.db")
+    metrics = PipelineMetrics("test")
+
+    snapshot.export_snapshot(tmp_path / "movies.db", tmp_path / "snapshot", metrics, arrow=True)
+    snapshot.restore_snapshot(tmp_path / "snapshot", tmp_path / "restored.db", metrics)
+
+    assert stored_rows(tmp_path / "restored.db") == stored_rows(tmp_path / "movies.db")
+    assert snapshot.open_table(tmp_path / "snapshot", "movies").num_rows == 4
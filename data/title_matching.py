@@ -0,0 +1,151 @@
+import re
+import time
+
+# Matching strategies in the order they are tried
+STRATEGIES = [
+    "normalized",
+    "no_article",
+    "simplified",
+    "no_colon",
+    "no_number",
+    "word_only",
+]
+
+def normalize_title(title):
+    """Remove year suffixes like "(2007 film)", "(film)" and other parentheses"""
+    title = re.sub(r'\s*\([^)]*film\)', '', title)
+    title = re.sub(r'\s*\([^)]*\)', '', title)
+    return title.strip()
+
+def remove_article(title):
+    """Remove a leading article (A, An, The)"""
+    return re.sub(r'^(A|An|The)\s+', '', title, flags=re.IGNORECASE)
+
+def simplify_title(title):
+    """Remove special characters and collapse whitespace"""
+    title = re.sub(r'[^\w\s]', '', title)
+    return re.sub(r'\s+', ' ', title).strip()
+
+def remove_colon(title):
+    """Remove colons and everything after them (subtitles)"""
+    return re.sub(r':\s*.*$', '', title)
+
+def remove_numbers(title):
+    """Remove digits and collapse whitespace"""
+    title = re.sub(r'\d+', '', title)
+    return re.sub(r'\s+', ' ', title).strip()
+
+def word_only_title(title):
+    """Remove all punctuation and digits and collapse whitespace"""
+    title = re.sub(r'[^\w\s]', '', title)
+    title = re.sub(r'\d+', '', title)
+    return re.sub(r'\s+', ' ', title).strip()
+
+STRATEGY_FUNCTIONS = {
+    "normalized": normalize_title,
+    "no_article": remove_article,
+    "simplified": simplify_title,
+    "no_colon": remove_colon,
+    "no_number": remove_numbers,
+    "word_only": word_only_title,
+}
+
+# Strategies that only index CSV titles the rule actually changed
+CHANGED_ONLY = {"no_article", "no_colon"}
+
+# Fuzzy candidates are collected at FUZZY_THRESHOLD and accepted at FUZZY_ACCEPT
+FUZZY_THRESHOLD = 0.9
+FUZZY_ACCEPT = 0.95
+
+def build_indexes(plot_data):
+    """Build one lookup dict per strategy from {csv_title: plot}"""
+    indexes = {name: {} for name in STRATEGIES}
+
+    for title, plot in plot_data.items():
+        for name in STRATEGIES:
+            key = STRATEGY_FUNCTIONS[name](title)
+            if not key:
+                continue
+            if name in CHANGED_ONLY and key == title:
+                continue
+            indexes[name][key] = plot
+
+    # Case-insensitive normalized lookup, keeping the first title seen
+    indexes["case_insensitive_normalized"] = {}
+    for key, plot in indexes["normalized"].items():
+        indexes["case_insensitive_normalized"].setdefault(key.lower(), plot)
+
+    return indexes
+
+def match_title_key(db_title, indexes, metrics=None):
+    """Try every strategy in order and return (strategy, key) or (None, None).
+
+    The key is the entry of indexes[strategy] that matched. When a
+    PipelineMetrics is given, each strategy attempt is timed.
+    """
+    for name in STRATEGIES:
+        start = time.perf_counter() if metrics else 0
+        key = STRATEGY_FUNCTIONS[name](db_title)
+        matched = key in indexes[name]
+        if metrics:
+            metrics.record_strategy(name, time.perf_counter() - start, matched)
+        if matched:
+            return name, key
+
+    start = time.perf_counter() if metrics else 0
+    key = normalize_title(db_title).lower()
+    matched = key in indexes["case_insensitive_normalized"]
+    if metrics:
+        metrics.record_strategy("case_insensitive_normalized", time.perf_counter() - start, matched)
+    if matched:
+        return "case_insensitive_normalized", key
+
+    return None, None
+
+def match_title(db_title, indexes, metrics=None):
+    """Try every strategy in order and return (plot, match_type) or (None, None)"""
+    name, key = match_title_key(db_title, indexes, metrics)
+    if name is None:
+        return None, None
+    return indexes[name][key], name
+
+def match_exact(db_title, plot_data):
+    """Match a title exactly, then case-insensitively; return (match_type, csv_title) or (None, None)"""
+    if db_title in plot_data:
+        return "exact", db_title
+    db_title_lower = db_title.lower()
+    for csv_title in plot_data:
+        if csv_title.lower() == db_title_lower:
+            return "case_insensitive", csv_title
+    return None, None
+
+def match_fuzzy(db_title, indexes):
+    """Fuzzy match the normalized title against the normalized index.
+
+    Returns (match_type, key, score) for the best candidate. match_type is
+    None when it scored below FUZZY_ACCEPT; all three are None when nothing
+    reached FUZZY_THRESHOLD.
+    """
+    fuzzy_matches = find_fuzzy_matches(normalize_title(db_title), indexes["normalized"], threshold=FUZZY_THRESHOLD)
+    if not fuzzy_matches:
+        return None, None, None
+    key, _, score = fuzzy_matches[0]
+    if score >= FUZZY_ACCEPT:
+        return f"fuzzy_{score:.2f}", key, score
+    return None, key, score
+
+def strategy_index(match_type):
+    """Index whose keys a match_type resolves to; fuzzy matches use the normalized index"""
+    return "normalized" if match_type.startswith("fuzzy") else match_type
+
+def find_fuzzy_matches(db_title, plot_data_dict, threshold=0.85):
+    """Find fuzzy matches using sequence matcher"""
+    # Imported here so exact-match callers don't pay for difflib at startup
+    from difflib import SequenceMatcher
+    
+    matches = []
+    for csv_title, plot in plot_data_dict.items():
+        similarity = SequenceMatcher(None, db_title.lower(), csv_title.lower()).ratio()
+        if similarity >= threshold:
+            matches.append((csv_title, plot, similarity))
+    return sorted(matches, key=lambda x: x[2], reverse=True)
@@ -3,20 +3,20 @@ import sqlite3
 import csv
 import os
 import glob
-import re
+import time
 from pathlib import Path
-from difflib import SequenceMatcher
+from checkpoints import batched, fail_stage, finish_stage, save_checkpoint, start_stage
+from instrumentation import PipelineMetrics
+from plot_matches import create_plot_matches_table, record_plot_matches
+from match_cache import BACKFILL_SCOPE, MatchCache
+from title_matching import build_indexes, match_fuzzy, match_title_key, strategy_index
+
+# Checkpoint row in pipeline_checkpoints, also shown by /api/admin/progress
+CHECKPOINT_STAGE = "plot_backfill"
 
 def load_csv_data(csv_files):
     """Load all plot data from CSV files with comprehensive normalization strategies"""
     plot_data = {}
-    normalized_plot_data = {}
-    no_article_plot_data = {}
-    simplified_plot_data = {}
-    # Additional strategies
-    no_colon_plot_data = {}
-    no_number_plot_data = {}
-    word_only_plot_data = {}
     
     for csv_file in csv_files:
         print(f"Processing {csv_file}...")
@@ -28,157 +28,97 @@ def load_csv_data(csv_files):
                     plot = row['plot'].strip()
                     if title and plot:
                         plot_data[title] = plot
-                        
-                        # Strategy 1: Remove year suffixes
-                        normalized_title = re.sub(r'\s*\([^)]*film\)', '', title)
-                        normalized_title = re.sub(r'\s*\([^)]*\)', '', normalized_title)
-                        normalized_title = normalized_title.strip()
-                        if normalized_title:
-                            normalized_plot_data[normalized_title] = plot
-                        
-                        # Strategy 2: Remove articles
-                        no_article_title = re.sub(r'^(A|An|The)\s+', '', title, flags=re.IGNORECASE)
-                        if no_article_title != title:
-                            no_article_plot_data[no_article_title] = plot
-                        
-                        # Strategy 3: Simplified title
-                        simplified_title = re.sub(r'[^\w\s]', '', title)
-                        simplified_title = re.sub(r'\s+', ' ', simplified_title).strip()
-                        if simplified_title:
-                            simplified_plot_data[simplified_title] = plot
-                        
-                        # Strategy 4: Remove colons and subtitles
-                        no_colon_title = re.sub(r':\s*.*$', '', title)
-                        if no_colon_title != title:
-                            no_colon_plot_data[no_colon_title] = plot
-                        
-                        # Strategy 5: Remove numbers
-                        no_number_title = re.sub(r'\d+', '', title)
-                        no_number_title = re.sub(r'\s+', ' ', no_number_title).strip()
-                        if no_number_title:
-                            no_number_plot_data[no_number_title] = plot
-                        
-                        # Strategy 6: Word-only (remove all punctuation and numbers)
-                        word_only_title = re.sub(r'[^\w\s]', '', title)
-                        word_only_title = re.sub(r'\d+', '', word_only_title)
-                        word_only_title = re.sub(r'\s+', ' ', word_only_title).strip()
-                        if word_only_title:
-                            word_only_plot_data[word_only_title] = plot
                             
         except Exception as e:
             print(f"Error processing {csv_file}: {e}")
     
-    return plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data, no_colon_plot_data, no_number_plot_data, word_only_plot_data
-
-def find_fuzzy_matches(db_title, plot_data_dict, threshold=0.85):
-    """Find fuzzy matches using sequence matcher"""
-    matches = []
-    for csv_title, plot in plot_data_dict.items():
-        similarity = SequenceMatcher(None, db_title.lower(), csv_title.lower()).ratio()
-        if similarity >= threshold:
-            matches.append((csv_title, plot, similarity))
-    return sorted(matches, key=lambda x: x[2], reverse=True)
+    # One lookup dict per strategy (see title_matching.STRATEGIES)
+    indexes = build_indexes(plot_data)
+    
+    return plot_data, indexes
 
-def find_missing_plots_advanced(db_path, plot_data, normalized_plot_data, no_article_plot_data, 
-                               simplified_plot_data, no_colon_plot_data, no_number_plot_data, word_only_plot_data):
-    """Find additional plots using comprehensive heuristics"""
+def get_movies_without_plots(db_path):
+    """Get all movies that don't have plots, in id order"""
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    cursor.execute("SELECT id, title FROM movies WHERE plot IS NULL")
-    movies_without_plots = cursor.fetchall()
+    cursor.execute("SELECT id, title FROM movies WHERE plot IS NULL ORDER BY id")
+    movies = cursor.fetchall()
     conn.close()
+    return movies
+
+def match_movies(movies, indexes, metrics=None, cache=None):
+    """Match (id, title) pairs against the strategy indexes.
+
+    With a MatchCache, titles decided on an earlier run (or earlier in this
+    one) skip the strategies and the fuzzy pass, and new decisions are stored.
+    """
+    matches = []
     
-    print(f"Movies without plots: {len(movies_without_plots)}")
-    
-    additional_matches = []
-    
-    for movie_id, db_title in movies_without_plots:
-        plot = None
-        match_type = None
-        
-        # Strategy 1: Normalized match
-        normalized_db = re.sub(r'\s*\([^)]*film\)', '', db_title)
-        normalized_db = re.sub(r'\s*\([^)]*\)', '', normalized_db)
-        normalized_db = normalized_db.strip()
-        if normalized_db in normalized_plot_data:
-            plot = normalized_plot_data[normalized_db]
-            match_type = "normalized"
-        
-        # Strategy 2: Remove articles
-        elif re.sub(r'^(A|An|The)\s+', '', db_title, flags=re.IGNORECASE) in no_article_plot_data:
-            no_article_db = re.sub(r'^(A|An|The)\s+', '', db_title, flags=re.IGNORECASE)
-            plot = no_article_plot_data[no_article_db]
-            match_type = "no_article"
-        
-        # Strategy 3: Simplified title
-        elif re.sub(r'[^\w\s]', '', db_title).strip() in simplified_plot_data:
-            simplified_db = re.sub(r'[^\w\s]', '', db_title)
-            simplified_db = re.sub(r'\s+', ' ', simplified_db).strip()
-            plot = simplified_plot_data[simplified_db]
-            match_type = "simplified"
-        
-        # Strategy 4: Remove colons
-        elif re.sub(r':\s*.*$', '', db_title) in no_colon_plot_data:
-            no_colon_db = re.sub(r':\s*.*$', '', db_title)
-            plot = no_colon_plot_data[no_colon_db]
-            match_type = "no_colon"
+    for movie_id, db_title in movies:
+        decision = cache.lookup(db_title) if cache else None
+        if decision:
+            match_type, key, score = decision
+            if match_type:
+                matches.append((movie_id, db_title, indexes[strategy_index(match_type)][key], match_type))
+            continue
         
-        # Strategy 5: Remove numbers
-        elif re.sub(r'\d+', '', db_title).strip() in no_number_plot_data:
-            no_number_db = re.sub(r'\d+', '', db_title)
-            no_number_db = re.sub(r'\s+', ' ', no_number_db).strip()
-            plot = no_number_plot_data[no_number_db]
-            match_type = "no_number"
-        
-        # Strategy 6: Word-only
-        elif re.sub(r'[^\w\s]', '', re.sub(r'\d+', '', db_title)).strip() in word_only_plot_data:
-            word_only_db = re.sub(r'[^\w\s]', '', re.sub(r'\d+', '', db_title))
-            word_only_db = re.sub(r'\s+', ' ', word_only_db).strip()
-            plot = word_only_plot_data[word_only_db]
-            match_type = "word_only"
-        
-        # Strategy 7: Case-insensitive versions of all above
-        elif normalized_db.lower() in {title.lower() for title in normalized_plot_data}:
-            for csv_title, csv_plot in normalized_plot_data.items():
-                if csv_title.lower() == normalized_db.lower():
-                    plot = csv_plot
-                    match_type = "case_insensitive_normalized"
-                    break
+        # Strategies 1-7: exact lookups on normalized titles
+        match_type, key = match_title_key(db_title, indexes, metrics)
+        plot = indexes[match_type][key] if match_type else None
+        score = 1.0 if match_type else None
         
         # Strategy 8: Fuzzy matching for high-confidence matches
-        else:
-            # Try fuzzy matching on normalized titles
-            fuzzy_matches = find_fuzzy_matches(normalized_db, normalized_plot_data, threshold=0.9)
-            if fuzzy_matches:
-                best_match = fuzzy_matches[0]
-                if best_match[2] >= 0.95:  # Very high confidence
-                    plot = best_match[1]
-                    match_type = f"fuzzy_{best_match[2]:.2f}"
+        if not plot:
+            start = time.perf_counter()
+            # Near misses keep their closest key and score for debug_matching
+            match_type, key, score = match_fuzzy(db_title, indexes)
+            if match_type:
+                plot = indexes["normalized"][key]
+            if metrics:
+                metrics.record_strategy("fuzzy", time.perf_counter() - start, plot is not None)
         
+        if cache:
+            cache.store(db_title, match_type, key, score)
         if plot:
-            additional_matches.append((movie_id, db_title, plot, match_type))
+            matches.append((movie_id, db_title, plot, match_type))
     
-    return additional_matches
+    return matches
 
-def update_database_with_additional_plots(db_path, additional_matches):
-    """Update database with additional plots found"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def backfill_in_batches(db_path, indexes, metrics=None, stage=CHECKPOINT_STAGE, cache=None):
+    """Match and write plots in committed batches, resuming from the last checkpoint"""
+    movies_without_plots = get_movies_without_plots(db_path)
+    print(f"Movies without plots: {len(movies_without_plots)}")
     
-    updated_count = 0
-    for movie_id, title, plot, match_type in additional_matches:
-        cursor.execute("UPDATE movies SET plot = ? WHERE id = ?", (plot, movie_id))
-        updated_count += 1
+    conn = sqlite3.connect(db_path)
+    create_plot_matches_table(conn)
+    checkpoint = start_stage(conn, stage, len(movies_without_plots))
+    remaining = [movie for movie in movies_without_plots if movie[0] > checkpoint["last_processed_id"]]
+    if metrics:
+        metrics.increment("movies_scanned", len(remaining))
     
-    conn.commit()
+    additional_matches = []
+    try:
+        for batch in batched(remaining):
+            matches = match_movies(batch, indexes, metrics, cache)
+            conn.executemany(
+                "UPDATE movies SET plot = ? WHERE id = ?",
+                [(plot, movie_id) for movie_id, title, plot, match_type in matches],
+            )
+            record_plot_matches(conn, [(movie_id, match_type) for movie_id, title, plot, match_type in matches])
+            # The checkpoint commits together with the batch's plot updates
+            save_checkpoint(conn, stage, batch[-1][0], len(batch), len(matches))
+            if cache:
+                cache.flush()
+            additional_matches.extend(matches)
+    except BaseException as e:
+        fail_stage(conn, stage, e)
+        conn.close()
+        raise
+    
+    matched = checkpoint["matched"] + len(additional_matches)
+    finish_stage(conn, stage, f"Completed! Matched {matched} additional movies.")
     conn.close()
-    
-    print(f"Updated {updated_count} additional movies with plot data")
-    
-    # Show some examples
-    print(f"\nSample additional matches:")
-    for movie_id, title, plot, match_type in additional_matches[:10]:
-        print(f"  '{title}' (matched via {match_type})")
+    return additional_matches
 
 def main():
     # Paths
@@ -194,16 +134,28 @@ def main():
     print(f"Target database: {db_path}")
     print(f"Found {len(csv_files)} CSV files")
     
+    metrics = PipelineMetrics("ultimate_plot_extraction")
+    
     # Load plot data with comprehensive strategies
-    plot_data, normalized_plot_data, no_article_plot_data, simplified_plot_data, no_colon_plot_data, no_number_plot_data, word_only_plot_data = load_csv_data(csv_files)
+    with metrics.stage("load_csv") as stage:
+        plot_data, indexes = load_csv_data(csv_files)
+        stage["rows"] = len(plot_data)
     
-    # Find additional plots
-    additional_matches = find_missing_plots_advanced(db_path, plot_data, normalized_plot_data, no_article_plot_data, 
-                                                   simplified_plot_data, no_colon_plot_data, no_number_plot_data, word_only_plot_data)
+    # Find additional plots and write them in committed batches
+    with metrics.stage("find_matches") as stage:
+        cache = MatchCache(plot_data, BACKFILL_SCOPE)
+        additional_matches = backfill_in_batches(db_path, indexes, metrics, cache=cache)
+        cache.close(metrics)
+        stage["rows"] = metrics.counters["movies_scanned"]
     
     if additional_matches:
         print(f"\nFound {len(additional_matches)} additional matches!")
-        update_database_with_additional_plots(db_path, additional_matches)
+        metrics.increment("movies_updated", len(additional_matches))
+        
+        # Show some examples
+        print(f"\nSample additional matches:")
+        for movie_id, title, plot, match_type in additional_matches[:10]:
+            print(f"  '{title}' (matched via {match_type})")
     else:
         print("\nNo additional matches found with current heuristics.")
     
@@ -220,6 +172,8 @@ def main():
     print(f"Movies with plots: {final_count}")
     print(f"Total movies: {total_count}")
     print(f"Match rate: {final_count/total_count*100:.1f}%")
+    
+    metrics.write()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
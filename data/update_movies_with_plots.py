@@ -4,6 +4,14 @@ import csv
 import os
 import glob
 from pathlib import Path
+from checkpoints import batched, fail_stage, finish_stage, save_checkpoint, start_stage
+from instrumentation import PipelineMetrics
+from match_cache import IMPORT_SCOPE, MatchCache
+from plot_matches import create_plot_matches_table, record_plot_matches
+from title_matching import match_exact
+
+# Checkpoint row in pipeline_checkpoints, also shown by /api/admin/progress
+CHECKPOINT_STAGE = "plot_import"
 
 def add_plot_column(db_path):
     """Add plot column to movies table if it doesn't exist"""
@@ -44,39 +52,70 @@ def load_csv_data(csv_files):
     print(f"Loaded {len(plot_data)} movie plots from CSV files")
     return plot_data
 
-def update_database(db_path, plot_data):
-    """Update database with plot data"""
+def update_database(db_path, plot_data, metrics=None, stage=CHECKPOINT_STAGE, cache=None):
+    """Update database with plot data in committed batches, resuming from the last checkpoint.
+
+    With a MatchCache, titles decided on an earlier run skip the
+    case-insensitive scan over every CSV title.
+    """
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Get all movie titles from database
-    cursor.execute("SELECT id, title FROM movies")
+    cursor.execute("SELECT id, title FROM movies ORDER BY id")
     movies = cursor.fetchall()
     
+    create_plot_matches_table(conn)
+    checkpoint = start_stage(conn, stage, len(movies))
+    remaining = [movie for movie in movies if movie[0] > checkpoint["last_processed_id"]]
+    
     updated_count = 0
     matched_count = 0
     
-    for movie_id, db_title in movies:
-        # Try to find exact match first
-        if db_title in plot_data:
-            plot = plot_data[db_title]
-            cursor.execute("UPDATE movies SET plot = ? WHERE id = ?", (plot, movie_id))
-            updated_count += 1
-            matched_count += 1
-            continue
-        
-        # Try case-insensitive match
-        db_title_lower = db_title.lower()
-        for csv_title, plot in plot_data.items():
-            if csv_title.lower() == db_title_lower:
-                cursor.execute("UPDATE movies SET plot = ? WHERE id = ?", (plot, movie_id))
-                updated_count += 1
-                matched_count += 1
-                break
-    
-    conn.commit()
+    try:
+        for batch in batched(remaining):
+            batch_matches = []
+            for movie_id, db_title in batch:
+                decision = cache.lookup(db_title) if cache else None
+                if decision:
+                    match_type, csv_title, score = decision
+                    if match_type:
+                        cursor.execute("UPDATE movies SET plot = ? WHERE id = ?", (plot_data[csv_title], movie_id))
+                        batch_matches.append((movie_id, match_type))
+                        if metrics:
+                            metrics.record_match(match_type)
+                    continue
+                
+                # Exact match first, then case-insensitive
+                match_type, csv_title = match_exact(db_title, plot_data)
+                if match_type:
+                    cursor.execute("UPDATE movies SET plot = ? WHERE id = ?", (plot_data[csv_title], movie_id))
+                    batch_matches.append((movie_id, match_type))
+                    if metrics:
+                        metrics.record_match(match_type)
+                if cache:
+                    cache.store(db_title, match_type, csv_title, 1.0 if match_type else None)
+            
+            record_plot_matches(conn, batch_matches)
+            batch_matched = len(batch_matches)
+            # The checkpoint commits together with the batch's plot updates
+            save_checkpoint(conn, stage, batch[-1][0], len(batch), batch_matched)
+            if cache:
+                cache.flush()
+            updated_count += batch_matched
+            matched_count += batch_matched
+    except BaseException as e:
+        fail_stage(conn, stage, e)
+        conn.close()
+        raise
+    
+    finish_stage(conn, stage, f"Completed! Updated {checkpoint['matched'] + updated_count} movies with plot data.")
     conn.close()
     
+    if metrics:
+        metrics.increment("movies_scanned", len(remaining))
+        metrics.increment("movies_updated", updated_count)
+    
     print(f"Updated {updated_count} movies with plot data")
     print(f"Matched {matched_count} movies out of {len(movies)} total movies")
 
@@ -99,16 +138,27 @@ def main():
         print(f"Error: Database file {db_path} not found!")
         return
     
+    metrics = PipelineMetrics("update_movies_with_plots")
+    
     # Add plot column
-    add_plot_column(db_path)
+    with metrics.stage("add_plot_column"):
+        add_plot_column(db_path)
     
     # Load plot data from CSV files
-    plot_data = load_csv_data(csv_files)
+    with metrics.stage("load_csv") as stage:
+        plot_data = load_csv_data(csv_files)
+        stage["rows"] = len(plot_data)
     
     # Update database
-    update_database(db_path, plot_data)
+    with metrics.stage("update_database") as stage:
+        cache = MatchCache(plot_data, IMPORT_SCOPE)
+        update_database(db_path, plot_data, metrics, cache=cache)
+        cache.close(metrics)
+        stage["rows"] = metrics.counters["movies_scanned"]
     
     print("Database update completed!")
+    
+    metrics.write()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
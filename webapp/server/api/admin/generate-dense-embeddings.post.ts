@@ -93,6 +93,10 @@ export default defineEventHandler(async (event) => {
     // Get all movies from database using the new AdminService
     movies = adminService.getAllMovies();
 
+    // Movies whose plot duplicates a canonical copy reuse its plot vectors;
+    // searches expand canonical hits to them (MovieService.expandPlotClusters)
+    const duplicatePlotMovieIds = adminService.getDuplicatePlotMovieIds();
+
     // Process movies and create chunks with chunk-based batching
     const maxChunksPerBatch = parseInt(process.env.DENSE_BATCH_SIZE || "50");
     const maxConcurrentBatches = parseInt(
@@ -121,7 +125,12 @@ export default defineEventHandler(async (event) => {
     for (const movie of movies) {
       try {
         // Extract chunks for the current movie
-        const movieChunks = await extractChunksForMovie(movie);
+        let movieChunks = await extractChunksForMovie(movie);
+
+        // Skip plot chunks that the canonical copy already embeds
+        if (duplicatePlotMovieIds.has(movie.id)) {
+          movieChunks = movieChunks.filter((chunk) => chunk.source !== "plot");
+        }
 
         // If the current movie has chunks, proceed to upsert them
         if (movieChunks.length > 0) {
@@ -220,6 +229,9 @@ export default defineEventHandler(async (event) => {
     // Wait for all pending batches to complete
     await Promise.all(pendingBatches);
 
+    // Point duplicate-plot movies at their canonical plot chunks
+    const sharedChunks = adminService.sharePlotChunkMappings();
+
     const endTime = Date.now();
     const duration = (endTime - startTime) / 1000; // seconds
 
@@ -229,13 +241,14 @@ export default defineEventHandler(async (event) => {
       processed: movies.length,
       total: movies.length,
       startTime: startTime,
-      message: `Completed! Processed ${totalChunks} chunks in ${duration} seconds.`,
+      message: `Completed! Processed ${totalChunks} chunks in ${duration} seconds. Shared ${sharedChunks} plot chunks across duplicate plots.`,
     };
 
     return {
       status: "success",
       message: `Dense embedding generation completed. Processed ${totalChunks} chunks in ${duration} seconds.`,
       totalChunks: totalChunks,
+      sharedChunks: sharedChunks,
     };
   } catch (error) {
     console.error("Error generating dense embeddings:", error);
@@ -80,6 +80,10 @@ export default defineEventHandler(async (event) => {
     // Get all movies from the database
     const movies = adminService.getAllMovies();
 
+    // Movies whose plot duplicates a canonical copy reuse its plot records;
+    // searches expand canonical hits to them (MovieService.expandPlotClusters)
+    const duplicatePlotMovieIds = adminService.getDuplicatePlotMovieIds();
+
     // Get batch config from environment variables
     const maxRecordsPerBatch = parseInt(process.env.SPARSE_BATCH_SIZE || "50");
     const maxConcurrentBatches = parseInt(
@@ -109,7 +113,12 @@ export default defineEventHandler(async (event) => {
     for (const movie of movies) {
       try {
         // Extract chunks for the current movie
-        const movieChunks = await extractChunksForMovie(movie);
+        let movieChunks = await extractChunksForMovie(movie);
+
+        // Skip plot chunks that the canonical copy already embeds
+        if (duplicatePlotMovieIds.has(movie.id)) {
+          movieChunks = movieChunks.filter((chunk) => chunk.source !== "plot");
+        }
 
         // If the current movie has chunks, proceed to upsert them
         if (movieChunks.length > 0) {
@@ -1,3 +1,5 @@
+const adminService = new AdminService();
+
 export default defineEventHandler(async (event) => {
   if (event.method !== "GET") {
     throw createError({
@@ -23,8 +25,12 @@ export default defineEventHandler(async (event) => {
     message: "",
   };
 
+  // Python pipeline progress is persisted in SQLite rather than in memory
+  const pipelineProgress = adminService.getPipelineProgress();
+
   return {
     dense: denseProgress,
     sparse: sparseProgress,
+    pipeline: pipelineProgress,
   };
 });
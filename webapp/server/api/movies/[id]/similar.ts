@@ -136,7 +136,7 @@ export default defineEventHandler(async (event) => {
 
   try {
     // Get the current movie
-    const currentMovie = movieService.getMovieById(id);
+    const currentMovie = movieService.getMovieById(id, { includeContext: true });
     if (!currentMovie) {
       throw createError({
         statusCode: 404,
@@ -144,8 +144,15 @@ export default defineEventHandler(async (event) => {
       });
     }
 
-    // Retrieve similar movies
-    const similarMovies = await retrieveSimilarMovies(currentMovie);
+    // Retrieve similar movies, including the near-duplicate plots of each hit
+    const similarMovies = movieService.withPlotClusterMovies(
+      await retrieveSimilarMovies(currentMovie),
+      {
+        excludeIds: [currentMovie.id],
+        includeWatched: true,
+        includeContext: true,
+      }
+    );
     if (similarMovies.length === 0) {
       return buildResponse(currentMovie, []);
     }
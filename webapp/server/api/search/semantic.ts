@@ -208,8 +208,11 @@ export default defineEventHandler(async (event) => {
       ),
     ]);
 
-    // Merge the results from both search methods
-    const uniqueMovieIds = new Set([...denseIds, ...sparseIds]);
+    // Merge the results from both search methods, adding movies whose
+    // near-duplicate plot is only embedded under a canonical movie
+    const uniqueMovieIds = new Set(
+      movieService.expandPlotClusters([...denseIds, ...sparseIds])
+    );
     if (uniqueMovieIds.size === 0) {
       return {
         movies: [],
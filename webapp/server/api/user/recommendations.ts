@@ -49,6 +49,11 @@ export default defineEventHandler(async (event) => {
     // ↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑
     // =============================================================
 
+    // Add the near-duplicate plots of each recommended movie
+    recommendations = movieService.withPlotClusterMovies(recommendations, {
+      excludeIds: watchedMoviesIds,
+    });
+
     return {
       recommendations: recommendations.map((movie) => ({
         id: movie.id,
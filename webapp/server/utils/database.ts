@@ -1,22 +1,105 @@
 import Database from "better-sqlite3";
+import { existsSync, statSync } from "node:fs";
 
 // Get database file from environment variable, default to movies.db
 export function getDatabasePath(): string {
   return process.env.DATABASE_FILE || "movies.db";
 }
 
-// Create a database instance with the configured database file
+// One shared connection per file, with the inode it was opened on
+const connections = new Map<string, { db: Database.Database; inode: number }>();
+
+function fileInode(dbPath: string): number {
+  return statSync(dbPath, { throwIfNoEntry: false })?.ino ?? 0;
+}
+
+// Get a connection to the configured database file. data/build_database.py
+// publishes a new build by renaming it over this file, so the connection is
+// reopened when the inode changes (never in the middle of a transaction).
 export function getDatabase(): Database.Database {
   const dbPath = getDatabasePath();
-  return new Database(dbPath);
+  const inode = fileInode(dbPath);
+  const cached = connections.get(dbPath);
+  if (cached && (cached.inode === inode || cached.db.inTransaction)) {
+    return cached.db;
+  }
+
+  cached?.db.close();
+  const db = new Database(dbPath);
+  connections.set(dbPath, { db, inode: fileInode(dbPath) });
+  return db;
+}
+
+// SQLite refuses writes through a connection whose file was renamed away
+function isDatabaseMoved(error: unknown): boolean {
+  return (error as { code?: string } | null)?.code === "SQLITE_READONLY_DBMOVED";
+}
+
+// SQLite gave up waiting for another connection's lock
+function isDatabaseBusy(error: unknown): boolean {
+  return (error as { code?: string } | null)?.code === "SQLITE_BUSY";
+}
+
+// Milliseconds a progress read waits on a build writing its staging file
+const STAGING_TIMEOUT_MS = 250;
+
+// Run a write against the configured database file. A write that waited on
+// the lock data/build_database.py holds while publishing fails on the file
+// that was replaced, so it is retried once on the newly published file.
+export function writeDatabase<T>(write: (db: Database.Database) => T): T {
+  try {
+    return write(getDatabase());
+  } catch (error) {
+    if (!isDatabaseMoved(error)) throw error;
+    return write(getDatabase());
+  }
+}
+
+// Check whether a table exists (some are created by the Python data pipeline)
+export function tableExists(db: Database.Database, name: string): boolean {
+  const stmt = db.prepare(
+    "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?"
+  );
+  return !!stmt.get(name);
+}
+
+// Read pipeline_checkpoints rows from a database, oldest stage first
+function readCheckpoints(
+  db: Database.Database
+): Omit<PipelineProgress, "staging">[] {
+  if (!tableExists(db, "pipeline_checkpoints")) return [];
+
+  const stmt = db.prepare(`
+    SELECT stage, status, last_processed_id, processed, matched, total,
+           started_at, updated_at, message
+    FROM pipeline_checkpoints
+    ORDER BY started_at
+  `);
+  const rows = stmt.all() as any[];
+
+  return rows.map((row) => ({
+    stage: row.stage,
+    status: row.status,
+    isRunning: row.status === "running",
+    processed: row.processed,
+    matched: row.matched,
+    total: row.total,
+    lastProcessedId: row.last_processed_id,
+    startTime: row.started_at,
+    updatedAt: row.updated_at,
+    message: row.message || "",
+  }));
 }
 
+// Precomputed RAG context columns, joined from movie_contexts (data/build_contexts.py)
+const CONTEXT_COLUMNS =
+  "mc.context AS rag_context, mc.token_count AS rag_context_tokens";
+
 // Movie operations
 export class MovieService {
-  private db: Database.Database;
-
-  constructor() {
-    this.db = getDatabase();
+  // Resolved per use so queries follow a swapped-in database file
+  private get db(): Database.Database {
+    return getDatabase();
   }
 
   // Get movies with pagination and watched status
@@ -64,9 +147,20 @@ export class MovieService {
     return this.addWatchedStatusToMovies(movies);
   }
 
+  // Select clause for movies, optionally with their precomputed RAG context
+  private movieColumns(includeContext: boolean): string {
+    if (includeContext && tableExists(this.db, "movie_contexts")) {
+      return `m.*, ${CONTEXT_COLUMNS} FROM movies m LEFT JOIN movie_contexts mc ON mc.movie_id = m.id`;
+    }
+    return "m.* FROM movies m";
+  }
+
   // Get movie by ID with watched status
-  getMovieById(id: number | string) {
-    const stmt = this.db.prepare("SELECT * FROM movies WHERE id = ?");
+  getMovieById(id: number | string, options?: { includeContext?: boolean }) {
+    const includeContext = options?.includeContext ?? false;
+    const stmt = this.db.prepare(
+      `SELECT ${this.movieColumns(includeContext)} WHERE m.id = ?`
+    );
     const movie = stmt.get(id) as any;
 
     if (!movie) return null;
@@ -121,6 +215,7 @@ export class MovieService {
     movieIds: number[],
     options?: {
       includeWatched?: boolean;
+      includeContext?: boolean;
       limit?: number;
       orderBy?: string;
     }
@@ -129,10 +224,13 @@ export class MovieService {
 
     const placeholders = movieIds.map(() => "?").join(",");
     const includeWatched = options?.includeWatched ?? false;
+    const includeContext = options?.includeContext ?? false;
     const limit = options?.limit;
     const orderBy = options?.orderBy ?? "vote_average DESC";
 
-    let query = `SELECT * FROM movies WHERE id IN (${placeholders}) ORDER BY ${orderBy}`;
+    let query = `SELECT ${this.movieColumns(
+      includeContext
+    )} WHERE m.id IN (${placeholders}) ORDER BY ${orderBy}`;
 
     if (limit) {
       query += ` LIMIT ?`;
@@ -146,6 +244,68 @@ export class MovieService {
     }
   }
 
+  // Expand vector search hits to every movie sharing their plot cluster
+  // (plot_clusters, written by data/dedupe_plots.py). Only the canonical
+  // movie's plot is embedded, so dense and sparse hits on a duplicated plot
+  // carry its id; each hit is followed by the rest of its cluster.
+  expandPlotClusters(movieIds: Iterable<number>): number[] {
+    const hits = [...new Set([...movieIds].map(Number))];
+    if (hits.length === 0 || !tableExists(this.db, "plot_clusters")) {
+      return hits;
+    }
+
+    const placeholders = hits.map(() => "?").join(",");
+    const stmt = this.db.prepare(`
+      SELECT hit.movie_id AS hit_id, member.movie_id AS member_id
+      FROM plot_clusters hit
+      JOIN plot_clusters member
+        ON member.canonical_movie_id = hit.canonical_movie_id
+      WHERE hit.movie_id IN (${placeholders})
+      ORDER BY member.movie_id
+    `);
+    const rows = stmt.all(...hits) as { hit_id: number; member_id: number }[];
+
+    const members = new Map<number, number[]>();
+    for (const row of rows) {
+      const cluster = members.get(row.hit_id) ?? [];
+      cluster.push(row.member_id);
+      members.set(row.hit_id, cluster);
+    }
+
+    const expanded = new Set<number>();
+    for (const id of hits) {
+      expanded.add(id);
+      for (const member of members.get(id) ?? []) expanded.add(member);
+    }
+    return [...expanded];
+  }
+
+  // Expand ranked movies with their plot cluster members (see
+  // expandPlotClusters), keeping the list length so lower hits make room
+  // for duplicates of higher ones
+  withPlotClusterMovies(
+    movies: any[],
+    options?: {
+      excludeIds?: number[];
+      includeWatched?: boolean;
+      includeContext?: boolean;
+    }
+  ): any[] {
+    if (movies.length === 0) return movies;
+
+    const excluded = new Set((options?.excludeIds ?? []).map(Number));
+    const ids = this.expandPlotClusters(movies.map((movie) => movie.id))
+      .filter((id) => !excluded.has(id))
+      .slice(0, movies.length);
+
+    const byId = new Map<number, any>(movies.map((movie) => [movie.id, movie]));
+    const missing = ids.filter((id) => !byId.has(id));
+    for (const movie of this.getMoviesByIds(missing, options)) {
+      byId.set(movie.id, movie);
+    }
+    return ids.map((id) => byId.get(id)).filter((movie) => movie);
+  }
+
   // Get random movie with plot for testing
   getRandomMovieWithPlot() {
     const stmt = this.db.prepare(`
@@ -223,10 +383,9 @@ export class MovieService {
 
 // User operations
 export class UserService {
-  private db: Database.Database;
-
-  constructor() {
-    this.db = getDatabase();
+  // Resolved per use so queries follow a swapped-in database file
+  private get db(): Database.Database {
+    return getDatabase();
   }
 
   // Get watched movies
@@ -262,25 +421,31 @@ export class UserService {
 
   // Add movie to watched list
   addMovieToWatched(movieId: number): void {
-    const stmt = this.db.prepare(
-      "INSERT INTO user_watched_movies (movie_id) VALUES (?)"
-    );
-    stmt.run(movieId);
+    writeDatabase((db) => {
+      const stmt = db.prepare(
+        "INSERT INTO user_watched_movies (movie_id) VALUES (?)"
+      );
+      stmt.run(movieId);
+    });
   }
 
   // Remove movie from watched list
   removeMovieFromWatched(movieId: number): number {
-    const stmt = this.db.prepare(
-      "DELETE FROM user_watched_movies WHERE movie_id = ?"
-    );
-    const result = stmt.run(movieId);
-    return result.changes;
+    return writeDatabase((db) => {
+      const stmt = db.prepare(
+        "DELETE FROM user_watched_movies WHERE movie_id = ?"
+      );
+      const result = stmt.run(movieId);
+      return result.changes;
+    });
   }
 
   // Clear all watched movies
   clearWatchedMovies(): void {
-    const stmt = this.db.prepare("DELETE FROM user_watched_movies");
-    stmt.run();
+    writeDatabase((db) => {
+      const stmt = db.prepare("DELETE FROM user_watched_movies");
+      stmt.run();
+    });
   }
 
   // Get watched movie count
@@ -327,31 +492,35 @@ export class UserService {
 
 // Admin operations
 export class AdminService {
-  private db: Database.Database;
-
-  constructor() {
-    this.db = getDatabase();
+  // Resolved per use so queries follow a swapped-in database file
+  private get db(): Database.Database {
+    return getDatabase();
   }
 
   // Create chunk_mappings table if it doesn't exist
   createChunkMappingsTable(): void {
-    const stmt = this.db.prepare(`
+    writeDatabase((db) => {
+      const stmt = db.prepare(`
       CREATE TABLE IF NOT EXISTS chunk_mappings (
-        id TEXT PRIMARY KEY,
-        movieId INTEGER NOT NULL,
-        chunkIndex INTEGER NOT NULL,
-        totalChunks INTEGER NOT NULL,
+        chunk_id TEXT NOT NULL,
+        movie_id INTEGER NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        total_chunks INTEGER NOT NULL,
         source TEXT NOT NULL,
-        FOREIGN KEY (movieId) REFERENCES movies(id)
-      )
+        PRIMARY KEY (movie_id, chunk_id),
+        FOREIGN KEY (movie_id) REFERENCES movies(id)
+      ) WITHOUT ROWID
     `);
-    stmt.run();
+      stmt.run();
+    });
   }
 
   // Clear chunk mappings
   clearChunkMappings(): void {
-    const stmt = this.db.prepare("DELETE FROM chunk_mappings");
-    stmt.run();
+    writeDatabase((db) => {
+      const stmt = db.prepare("DELETE FROM chunk_mappings");
+      stmt.run();
+    });
   }
 
   // Prepare chunk_mappings table for new data (create if needed, clear existing)
@@ -370,36 +539,40 @@ export class AdminService {
     totalChunks: number,
     source: string
   ): void {
-    const stmt = this.db.prepare(`
-      INSERT INTO chunk_mappings (id, movieId, chunkIndex, totalChunks, source) 
-      VALUES (?, ?, ?, ?, ?)
-    `);
-    stmt.run(chunkId, movieId, chunkIndex, totalChunks, source);
+    writeDatabase((db) => {
+      const stmt = db.prepare(`
+        INSERT INTO chunk_mappings (chunk_id, movie_id, chunk_index, total_chunks, source) 
+        VALUES (?, ?, ?, ?, ?)
+      `);
+      stmt.run(chunkId, movieId, chunkIndex, totalChunks, source);
+    });
   }
 
   // Batch insert chunk mappings for better performance
   saveChunkToMovieMappings(chunkMappings: ChunkMapping[]): void {
     if (chunkMappings.length === 0) return;
 
-    // Use a transaction for better performance and atomicity
-    const transaction = this.db.transaction(() => {
-      const stmt = this.db.prepare(`
-        INSERT INTO chunk_mappings (chunk_id, movie_id, chunk_index, total_chunks, source) 
-        VALUES (?, ?, ?, ?, ?)
-      `);
-
-      for (const mapping of chunkMappings) {
-        stmt.run(
-          mapping.id,
-          mapping.movieId,
-          mapping.chunkIndex,
-          mapping.totalChunks,
-          mapping.source
-        );
-      }
+    writeDatabase((db) => {
+      // Use a transaction for better performance and atomicity
+      const transaction = db.transaction(() => {
+        const stmt = db.prepare(`
+          INSERT INTO chunk_mappings (chunk_id, movie_id, chunk_index, total_chunks, source) 
+          VALUES (?, ?, ?, ?, ?)
+        `);
+
+        for (const mapping of chunkMappings) {
+          stmt.run(
+            mapping.id,
+            mapping.movieId,
+            mapping.chunkIndex,
+            mapping.totalChunks,
+            mapping.source
+          );
+        }
+      });
+
+      transaction();
     });
-
-    transaction();
   }
 
   // Get chunk mappings by movie IDs
@@ -414,6 +587,68 @@ export class AdminService {
   //   return stmt.all(...movieIds) as any[];
   // }
 
+  // Get IDs of movies whose plot is a near-duplicate of another movie's plot
+  getDuplicatePlotMovieIds(): Set<number> {
+    if (!tableExists(this.db, "plot_clusters")) return new Set();
+
+    const stmt = this.db.prepare(`
+      SELECT movie_id FROM plot_clusters
+      WHERE movie_id != canonical_movie_id
+    `);
+    const rows = stmt.all() as { movie_id: number }[];
+    return new Set(rows.map((row) => row.movie_id));
+  }
+
+  // Map duplicate-plot movies to the plot chunks of their canonical movie
+  // so a watched duplicate's recommendations start from its shared vectors
+  sharePlotChunkMappings(): number {
+    if (!tableExists(this.db, "plot_clusters")) return 0;
+
+    return writeDatabase((db) => {
+      const stmt = db.prepare(`
+        INSERT INTO chunk_mappings (chunk_id, movie_id, chunk_index, total_chunks, source)
+        SELECT cm.chunk_id, pc.movie_id, cm.chunk_index, cm.total_chunks, cm.source
+        FROM plot_clusters pc
+        JOIN chunk_mappings cm
+          ON cm.movie_id = pc.canonical_movie_id AND cm.source = 'plot'
+        WHERE pc.movie_id != pc.canonical_movie_id
+      `);
+      return stmt.run().changes;
+    });
+  }
+
+  // Get progress of the Python data pipeline stages (written by data/checkpoints.py).
+  // A --build run checkpoints into <db>.staging, whose rows replace the live
+  // file's rows for the same stage until the build is published.
+  getPipelineProgress(): PipelineProgress[] {
+    const progress = new Map<string, PipelineProgress>();
+    for (const row of readCheckpoints(this.db)) {
+      progress.set(row.stage, { ...row, staging: false });
+    }
+
+    const stagingPath = `${getDatabasePath()}.staging`;
+    if (existsSync(stagingPath)) {
+      const staging = new Database(stagingPath, {
+        readonly: true,
+        fileMustExist: true,
+        timeout: STAGING_TIMEOUT_MS,
+      });
+      try {
+        for (const row of readCheckpoints(staging)) {
+          progress.set(row.stage, { ...row, staging: true });
+        }
+      } catch (error) {
+        // A build holds an exclusive lock while it writes out a large
+        // transaction (a restore, say); show the live rows until it commits
+        if (!isDatabaseBusy(error)) throw error;
+      } finally {
+        staging.close();
+      }
+    }
+
+    return [...progress.values()].sort((a, b) => a.startTime - b.startTime);
+  }
+
   // Get all movies for embedding generation
   getAllMovies(): Movie[] {
     const stmt = this.db.prepare(`
@@ -28,7 +28,9 @@ export async function getGroqClient() {
       throw new Error("GROQ_API_KEY environment variable is required");
     }
     try {
-      groqInstance = new Groq({ apiKey: apiKey });
+      // GROQ_BASE_URL points the client at a local stand-in (data/standin_services.py)
+      const baseURL = process.env.GROQ_BASE_URL;
+      groqInstance = new Groq({ apiKey: apiKey, ...(baseURL && { baseURL }) });
       // Test the connection by listing models (this doesn't use credits)
       await groqInstance.models.list();
       // If we get here, the connection was successful
@@ -22,7 +22,12 @@ export async function getPineconeClient() {
       throw new Error("PINECONE_API_KEY environment variable is required");
     }
     try {
-      pineconeClient = new Pinecone({ apiKey: apiKey });
+      // PINECONE_CONTROLLER_HOST points the client at a local stand-in (data/standin_services.py)
+      const controllerHostUrl = process.env.PINECONE_CONTROLLER_HOST;
+      pineconeClient = new Pinecone({
+        apiKey: apiKey,
+        ...(controllerHostUrl && { controllerHostUrl }),
+      });
       if (!indexesValidated) {
         await ensureIndexesExist(pineconeClient);
         indexesValidated = true;
@@ -28,6 +28,9 @@ export interface Movie {
   genre: string | null;
   release_date: string | null;
   vote_average: number;
+  // Precomputed by data/build_contexts.py, only selected with includeContext
+  rag_context?: string | null;
+  rag_context_tokens?: number | null;
 }
 
 export interface BatchProcessingResult {
@@ -43,3 +46,14 @@ export interface EmbeddingProgress {
   startTime: number;
   message: string;
 }
+
+// Progress of a data pipeline stage, read from pipeline_checkpoints
+export interface PipelineProgress extends EmbeddingProgress {
+  stage: string;
+  status: string;
+  matched: number;
+  lastProcessedId: number;
+  updatedAt: number;
+  // Read from the staging file of an unpublished --build run
+  staging: boolean;
+}
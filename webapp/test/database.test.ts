@@ -0,0 +1,162 @@
+import { describe, it, expect, beforeEach, afterEach } from "vitest";
+import Database from "better-sqlite3";
+import { mkdtempSync, renameSync, rmSync } from "node:fs";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import {
+  AdminService,
+  getDatabase,
+  writeDatabase,
+} from "~/server/utils/database";
+
+// Write a database file with one watched movie, as data/build_database.py would publish it
+function writeBuild(path: string, movieId: number) {
+  const db = new Database(path);
+  db.exec("CREATE TABLE user_watched_movies (movie_id INTEGER PRIMARY KEY)");
+  db.prepare("INSERT INTO user_watched_movies (movie_id) VALUES (?)").run(movieId);
+  db.close();
+}
+
+function watchedIds(db: Database.Database): number[] {
+  const rows = db
+    .prepare("SELECT movie_id FROM user_watched_movies ORDER BY movie_id")
+    .all() as { movie_id: number }[];
+  return rows.map((row) => row.movie_id);
+}
+
+describe("getDatabase", () => {
+  let dir: string;
+  let livePath: string;
+  let previousFile: string | undefined;
+
+  beforeEach(() => {
+    dir = mkdtempSync(join(tmpdir(), "pinestream-db-"));
+    livePath = join(dir, "movies.db");
+    writeBuild(livePath, 1);
+    previousFile = process.env.DATABASE_FILE;
+    process.env.DATABASE_FILE = livePath;
+  });
+
+  afterEach(() => {
+    getDatabase().close();
+    process.env.DATABASE_FILE = previousFile;
+    rmSync(dir, { recursive: true, force: true });
+  });
+
+  it("reuses one connection while the file is unchanged", () => {
+    expect(getDatabase()).toBe(getDatabase());
+  });
+
+  it("reopens the connection when a new build is renamed over the file", () => {
+    const before = getDatabase();
+    expect(watchedIds(before)).toEqual([1]);
+
+    writeBuild(join(dir, "movies.db.new"), 2);
+    renameSync(join(dir, "movies.db.new"), livePath);
+
+    const after = getDatabase();
+    expect(after).not.toBe(before);
+    expect(before.open).toBe(false);
+    expect(watchedIds(after)).toEqual([2]);
+  });
+
+  it("keeps the connection until an open transaction finishes", () => {
+    const db = getDatabase();
+    db.exec("BEGIN");
+    writeBuild(join(dir, "movies.db.new"), 2);
+    renameSync(join(dir, "movies.db.new"), livePath);
+
+    expect(getDatabase()).toBe(db);
+    db.exec("ROLLBACK");
+    expect(getDatabase()).not.toBe(db);
+  });
+
+  it("retries a write that hit the replaced file on the published one", () => {
+    // Stands in for a connection whose write was waiting on the publish lock
+    const stale = new Database(livePath);
+    watchedIds(stale);
+    writeBuild(join(dir, "movies.db.new"), 2);
+    renameSync(join(dir, "movies.db.new"), livePath);
+
+    let attempts = 0;
+    writeDatabase((db) => {
+      attempts += 1;
+      const target = attempts === 1 ? stale : db;
+      target.prepare("INSERT INTO user_watched_movies (movie_id) VALUES (?)").run(3);
+    });
+    stale.close();
+
+    expect(attempts).toBe(2);
+    expect(watchedIds(getDatabase())).toEqual([2, 3]);
+  });
+
+  it("doesn't retry other write errors", () => {
+    let attempts = 0;
+    expect(() =>
+      writeDatabase((db) => {
+        attempts += 1;
+        db.prepare("INSERT INTO user_watched_movies (movie_id) VALUES (?)").run(1);
+      })
+    ).toThrow(/UNIQUE/);
+    expect(attempts).toBe(1);
+  });
+});
+
+// Write a pipeline_checkpoints table with one stage, as data/checkpoints.py would
+function writeCheckpoint(path: string, stage: string, startedAt: number) {
+  const db = new Database(path);
+  db.exec(`
+    CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+      stage TEXT PRIMARY KEY, status TEXT NOT NULL,
+      last_processed_id INTEGER NOT NULL DEFAULT 0, processed INTEGER NOT NULL DEFAULT 0,
+      matched INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0,
+      started_at INTEGER NOT NULL, updated_at INTEGER NOT NULL, message TEXT
+    )
+  `);
+  db.prepare(
+    "INSERT INTO pipeline_checkpoints (stage, status, started_at, updated_at) VALUES (?, 'running', ?, ?)"
+  ).run(stage, startedAt, startedAt);
+  db.close();
+}
+
+describe("getPipelineProgress", () => {
+  let dir: string;
+  let livePath: string;
+  let previousFile: string | undefined;
+  const adminService = new AdminService();
+
+  beforeEach(() => {
+    dir = mkdtempSync(join(tmpdir(), "pinestream-progress-"));
+    livePath = join(dir, "movies.db");
+    writeCheckpoint(livePath, "plot_backfill", 1);
+    writeCheckpoint(`${livePath}.staging`, "convert", 2);
+    previousFile = process.env.DATABASE_FILE;
+    process.env.DATABASE_FILE = livePath;
+  });
+
+  afterEach(() => {
+    getDatabase().close();
+    process.env.DATABASE_FILE = previousFile;
+    rmSync(dir, { recursive: true, force: true });
+  });
+
+  it("includes the stages of a running --build", () => {
+    const progress = adminService.getPipelineProgress();
+    expect(progress.map((row) => [row.stage, row.staging])).toEqual([
+      ["plot_backfill", false],
+      ["convert", true],
+    ]);
+  });
+
+  it("shows the live stages while the build holds its staging file locked", () => {
+    const build = new Database(`${livePath}.staging`);
+    build.exec("BEGIN EXCLUSIVE");
+    try {
+      const progress = adminService.getPipelineProgress();
+      expect(progress.map((row) => row.stage)).toEqual(["plot_backfill"]);
+    } finally {
+      build.exec("ROLLBACK");
+      build.close();
+    }
+  });
+});
@@ -0,0 +1,89 @@
+import { describe, it, expect, beforeEach, afterEach } from "vitest";
+import Database from "better-sqlite3";
+import { mkdtempSync, rmSync } from "node:fs";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import { getDatabase, MovieService } from "~/server/utils/database";
+
+// Movies 1 and 2 share a near-duplicate plot, as data/dedupe_plots.py would
+// cluster them; only movie 1's plot chunks are embedded
+function writeCatalog(path: string) {
+  const db = new Database(path);
+  db.exec(`
+    CREATE TABLE movies (
+      id INTEGER PRIMARY KEY, title TEXT, overview TEXT, plot TEXT,
+      genre TEXT, release_date TEXT, vote_average REAL
+    );
+    CREATE TABLE user_watched_movies (movie_id INTEGER PRIMARY KEY);
+    CREATE TABLE plot_clusters (
+      movie_id INTEGER PRIMARY KEY, cluster_id INTEGER NOT NULL,
+      canonical_movie_id INTEGER NOT NULL, similarity REAL NOT NULL
+    );
+  `);
+  const insert = db.prepare(
+    "INSERT INTO movies (id, title, plot, vote_average) VALUES (?, ?, ?, ?)"
+  );
+  insert.run(1, "Heist", "A crew robs a casino vault.", 7.0);
+  insert.run(2, "Heist (Director's Cut)", "A crew robs a casino vault.", 7.5);
+  insert.run(3, "Voyage", "A ship crosses the ocean.", 6.0);
+  db.exec(`
+    INSERT INTO plot_clusters VALUES (1, 1, 1, 1.0), (2, 1, 1, 0.97);
+  `);
+  db.close();
+}
+
+describe("plot cluster expansion", () => {
+  let dir: string;
+  let previousFile: string | undefined;
+  const movieService = new MovieService();
+
+  beforeEach(() => {
+    dir = mkdtempSync(join(tmpdir(), "pinestream-clusters-"));
+    const path = join(dir, "movies.db");
+    writeCatalog(path);
+    previousFile = process.env.DATABASE_FILE;
+    process.env.DATABASE_FILE = path;
+  });
+
+  afterEach(() => {
+    getDatabase().close();
+    process.env.DATABASE_FILE = previousFile;
+    rmSync(dir, { recursive: true, force: true });
+  });
+
+  it("returns the duplicate when a plot query hits the canonical movie", () => {
+    // Dense and sparse hits only ever carry the canonical movie's id
+    const denseIds = new Set([1]);
+    const sparseIds = new Set([3, 1]);
+
+    expect(movieService.expandPlotClusters([...denseIds, ...sparseIds])).toEqual([
+      1, 2, 3,
+    ]);
+  });
+
+  it("returns the rest of the cluster when the duplicate is hit", () => {
+    expect(movieService.expandPlotClusters([2])).toEqual([2, 1]);
+  });
+
+  it("leaves hits alone without plot_clusters", () => {
+    getDatabase().exec("DROP TABLE plot_clusters");
+    expect(movieService.expandPlotClusters([3, 1])).toEqual([3, 1]);
+  });
+
+  it("ranks a duplicate right after its canonical hit and keeps the length", () => {
+    const ranked = movieService.getMoviesByIds([1, 3], { orderBy: "id" });
+    const movies = movieService.withPlotClusterMovies(ranked);
+
+    expect(movies.map((movie) => movie.id)).toEqual([1, 2]);
+  });
+
+  it("drops excluded movies such as the one being compared", () => {
+    const ranked = movieService.getMoviesByIds([1, 3], { orderBy: "id" });
+    const movies = movieService.withPlotClusterMovies(ranked, {
+      excludeIds: [2],
+      includeWatched: true,
+    });
+
+    expect(movies.map((movie) => movie.id)).toEqual([1, 3]);
+  });
+});
@@ -3,12 +3,15 @@
 
 // Fetch movie plots from database for reranking
 const movieIdsArray = Array.from(movieIds);
-const movies = movieService.getMoviesByIds(movieIdsArray);
+const movies = movieService.getMoviesByIds(movieIdsArray, {
+  includeContext: true,
+});
 
 // Prepare the texts to rerank
 const texts = movies.map((movie) => {
-  // Use plot if available, otherwise fallback to overview
-  const text = movie.plot || movie.overview || movie.title || "";
+  // Use the precomputed context if available, otherwise fallback to plot or overview
+  const text =
+    movie.rag_context || movie.plot || movie.overview || movie.title || "";
   return {
     id: String(movie.id), // Convert to string for reranker
     text: text,
@@ -31,8 +31,11 @@ try {
   const groq = await getGroqClient();
   const prompt = `
       Reference Movie: \n${currentMovie.title}
-      Plot: \n${
-        currentMovie.plot || currentMovie.overview || "No plot available"
+      Context: \n${
+        currentMovie.rag_context ||
+        currentMovie.plot ||
+        currentMovie.overview ||
+        "No plot available"
       }
 
       Movies to analyze:
@@ -41,7 +44,9 @@ try {
           (movie: any, index: number) => `
           ${index + 1}.
           Title: \n${movie.title} - ${movie.genre || "N/A"}
-          Plot: \n${movie.plot || movie.overview || "No plot available"}
+          Context: \n${
+            movie.rag_context || movie.plot || movie.overview || "No plot available"
+          }
           `
         )
         .join("\n\n")}
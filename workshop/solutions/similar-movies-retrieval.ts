@@ -69,6 +69,7 @@ if (topMovieIds.length === 0) {
 // Fetch full movie data for the top similar movies
 const similarMovies = movieService.getMoviesByIds(topMovieIds, {
   includeWatched: true,
+  includeContext: true,
 });
 
 return similarMovies;